@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.dependencies import get_ip_checker_service, get_security_service, get_verdict_filter_service
+from app.utils.ip_utils import canonicalize_ip
+from app.utils.rate_limiter import AsyncRateLimiter
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FIELDS = ["ip_score", "ip_reputation", "ip_confidence", "risk_level", "reputation_score", "error"]
+
+CallKey = Tuple[Optional[str], Optional[str]]
+
+# Per-process state of pool workers
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(rate_per_worker: float):
+    """Set up an event loop and a rate-limited SecurityService in a pool process"""
+    global _loop
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+
+    async def setup():
+        ip_checker = await get_ip_checker_service()
+        ip_checker.rate_limiter = AsyncRateLimiter(rate_per_worker)
+        verdict_filters = await get_verdict_filter_service()
+        if verdict_filters:
+            await verdict_filters.refresh()
+        await get_security_service()
+
+    _loop.run_until_complete(setup())
+
+
+def _score_keys(keys: List[CallKey]) -> Dict[CallKey, Dict[str, Any]]:
+    """Score unique (phone number, IP) pairs inside a pool process"""
+    return _loop.run_until_complete(_score_keys_async(keys))
+
+
+async def _score_keys_async(keys: List[CallKey]) -> Dict[CallKey, Dict[str, Any]]:
+    security_service = await get_security_service()
+    ips = [ip for _, ip in keys if ip]
+    scores = await security_service.check_ips_bulk(ips) if ips else {}
+
+    results = {}
+    for phone_number, ip in keys:
+        result: Dict[str, Any] = {}
+        ip_score = scores.get(ip) if ip else None
+        if ip_score:
+            result.update(
+                ip_score=ip_score.score,
+                ip_reputation=ip_score.reputation.value,
+                ip_confidence=ip_score.confidence
+            )
+        if phone_number:
+            caller_info = security_service.assess_caller(phone_number, ip_score)
+            result.update(
+                risk_level=caller_info.risk_level.value,
+                reputation_score=caller_info.reputation_score
+            )
+        results[(phone_number, ip)] = result
+    return results
+
+
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def _read_rows(path: str, fmt: str) -> Iterator[Tuple[Dict[str, Any], Optional[str]]]:
+    """Yield (row, error) pairs; malformed NDJSON lines come back as a raw row with an error"""
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            for row in csv.DictReader(handle):
+                yield row, None
+        else:
+            for line in handle:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield {"raw": line.rstrip("\r\n")}, f"Invalid record: {e}"
+                    continue
+                if isinstance(row, dict):
+                    yield row, None
+                else:
+                    yield {"raw": row}, "Invalid record: not a JSON object"
+
+
+def _call_key(row: Dict[str, Any], phone_field: str, ip_field: str) -> Tuple[CallKey, Optional[str]]:
+    """Build the dedupe key for a row, or an error message for invalid IPs"""
+    phone_number = str(row.get(phone_field) or "").strip() or None
+    raw_ip = str(row.get(ip_field) or "").strip()
+    if not raw_ip:
+        return (phone_number, None), None
+    try:
+        return (phone_number, canonicalize_ip(raw_ip)), None
+    except ValueError:
+        return (phone_number, None), f"Invalid IP: {raw_ip}"
+
+
+class BatchScorer:
+    """Stream a call-record file through a process pool and write verdicts incrementally
+
+    Rows are read in chunks; each chunk's unique (phone, IP) pairs are scored
+    by a pool worker using bulk cache lookups. At most ``2 * workers`` chunks
+    are in flight, so memory stays flat. After every chunk is written, a
+    checkpoint records the rows done and the output size, which lets an
+    interrupted run resume where it stopped.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.input_format = _detect_format(args.input, args.format)
+        self.output_format = _detect_format(args.output, args.format)
+        self.checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+
+    def _load_checkpoint(self) -> Dict[str, int]:
+        if self.args.resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as handle:
+                return json.load(handle)
+        return {"rows_done": 0, "output_offset": 0}
+
+    def _save_checkpoint(self, rows_done: int, output_offset: int):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"rows_done": rows_done, "output_offset": output_offset}, handle)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def run(self) -> int:
+        checkpoint = self._load_checkpoint()
+        rows_done = checkpoint["rows_done"]
+        if rows_done:
+            logger.info(f"Resuming after {rows_done} rows")
+
+        rows = islice(_read_rows(self.args.input, self.input_format), rows_done, None)
+        rate_per_worker = self.args.rate / self.args.workers
+
+        mode = "r+" if checkpoint["output_offset"] else "w"
+        with open(self.args.output, mode, newline="", encoding="utf-8") as output, \
+                ProcessPoolExecutor(self.args.workers, initializer=_init_worker,
+                                    initargs=(rate_per_worker,)) as pool:
+            output.seek(checkpoint["output_offset"])
+            output.truncate()
+            writer = None
+
+            in_flight = deque()
+            while True:
+                chunk = list(islice(rows, self.args.chunk_size))
+                if chunk:
+                    keyed = [
+                        (row, (None, None), read_error) if read_error
+                        else (row, *_call_key(row, self.args.phone_field, self.args.ip_field))
+                        for row, read_error in chunk
+                    ]
+                    unique_keys = list(dict.fromkeys(key for _, key, _ in keyed))
+                    in_flight.append((keyed, pool.submit(_score_keys, unique_keys)))
+
+                if not in_flight:
+                    break
+                if chunk and len(in_flight) < self.args.workers * 2:
+                    continue
+
+                keyed, future = in_flight.popleft()
+                results = future.result()
+                writer = self._write_chunk(output, writer, keyed, results)
+                output.flush()
+
+                rows_done += len(keyed)
+                self._save_checkpoint(rows_done, output.tell())
+                logger.info(f"Scored {rows_done} rows")
+
+        return rows_done
+
+    def _write_chunk(self, output, writer, keyed, results):
+        for row, key, error in keyed:
+            record = {**row, **results.get(key, {})}
+            if error:
+                record["error"] = error
+
+            if self.output_format == "csv":
+                if writer is None:
+                    fieldnames = list(row.keys()) + [f for f in OUTPUT_FIELDS if f not in row]
+                    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction="ignore")
+                    if output.tell() == 0:
+                        writer.writeheader()
+                writer.writerow(record)
+            else:
+                output.write(json.dumps(record) + "\n")
+        return writer
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Score call-record files (CSV or NDJSON) offline")
+    parser.add_argument("input", help="Input file with phone number / IP pairs")
+    parser.add_argument("output", help="Output file; format follows its extension")
+    parser.add_argument("--format", choices=["csv", "ndjson"],
+                        help="Force input and output format")
+    parser.add_argument("--phone-field", default="phone_number")
+    parser.add_argument("--ip-field", default="ip")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=settings.BATCH_CHUNK_SIZE)
+    parser.add_argument("--rate", type=float, default=settings.BATCH_PROVIDER_RATE_PER_SECOND,
+                        help="Provider checks per second across all workers")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the checkpoint of a previous run")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    rows = BatchScorer(args).run()
+    logger.info(f"Batch scoring complete: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional, Tuple
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a lane is saturated and the request is shed"""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"{lane} lane saturated, retry after {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """Concurrency limit with a bounded, deadline-based wait queue
+
+    The limit adapts once per window of ``limit`` completions, from the
+    gradient between the acceptable latency (the minimum observed over
+    ADMISSION_MIN_LATENCY_SECONDS times ADMISSION_LATENCY_TOLERANCE, and
+    never below the lane's target) and the window's average latency. The
+    update is smoothed, so one window shrinks the limit by at most ~10% and
+    a single slow request cannot move it; while latency is acceptable and
+    the lane is at least half used, the limit grows by ~0.2 * sqrt(limit).
+    """
+
+    def __init__(self, name: str, initial_limit: int, max_limit: int,
+                 queue_timeout_ms: int, target_latency_ms: int):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = settings.ADMISSION_MIN_LIMIT
+        self.max_limit = max_limit
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.target_latency = target_latency_ms / 1000
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.avg_latency = self.target_latency
+        self._waiters: Deque[asyncio.Future] = deque()
+        # (time, minimum latency) of recent windows
+        self._window_minima: Deque[Tuple[float, float]] = deque()
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_count = 0
+        self._window_total = 0.0
+        self._window_min = math.inf
+        self._window_peak = 0
+
+    @property
+    def min_latency(self) -> float:
+        """Lowest latency seen over the last ADMISSION_MIN_LATENCY_SECONDS (the unloaded baseline)"""
+        if not self._window_minima:
+            return self.target_latency
+        return min(latency for _, latency in self._window_minima)
+
+    def _record(self, latency: float):
+        """Add a completion to the current window and adapt the limit when it is full"""
+        self.avg_latency = 0.9 * self.avg_latency + 0.1 * latency
+        self._window_count += 1
+        self._window_total += latency
+        self._window_min = min(self._window_min, latency)
+        self._window_peak = max(self._window_peak, self.in_flight)
+        if self._window_count < int(self.limit):
+            return
+
+        now = time.monotonic()
+        self._window_minima.append((now, self._window_min))
+        while now - self._window_minima[0][0] > settings.ADMISSION_MIN_LATENCY_SECONDS:
+            self._window_minima.popleft()
+        sample = self._window_total / self._window_count
+        acceptable = max(self.min_latency * settings.ADMISSION_LATENCY_TOLERANCE, self.target_latency)
+        gradient = max(0.5, min(1.0, acceptable / sample))
+
+        if gradient < 1.0 or self._window_peak >= self.limit / 2:
+            new_limit = self.limit * gradient + math.sqrt(self.limit)
+            self.limit = 0.8 * self.limit + 0.2 * new_limit
+            self.limit = max(self.min_limit, min(self.max_limit, self.limit))
+        self._reset_window()
+
+    def _reject(self) -> AdmissionRejected:
+        self.shed += 1
+        backlog = (len(self._waiters) + 1) / max(self.limit, 1.0)
+        return AdmissionRejected(self.name, max(1, math.ceil(self.avg_latency * backlog)))
+
+    async def acquire(self):
+        """Take a slot, waiting at most the queue timeout"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= settings.ADMISSION_MAX_QUEUE:
+            raise self._reject()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            raise self._reject()
+        except asyncio.CancelledError:
+            # A slot granted right before cancellation must be handed back
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            self._discard(waiter)
+            raise
+        self.admitted += 1
+
+    def release(self, latency: Optional[float] = None):
+        """Free a slot, adapt the limit and wake queued requests"""
+        if latency is not None:
+            self._record(latency)
+        self.in_flight -= 1
+
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "avg_latency_ms": round(self.avg_latency * 1000, 1),
+            "min_latency_ms": round(self.min_latency * 1000, 1)
+        }
+
+
+class AdmissionController:
+    """Separate admission lanes for cheap cache work and provider-bound misses"""
+
+    def __init__(self):
+        self.lanes: Dict[str, AdaptiveLimiter] = {
+            "hit": AdaptiveLimiter(
+                "hit",
+                settings.ADMISSION_HIT_LIMIT,
+                settings.ADMISSION_HIT_MAX_LIMIT,
+                settings.ADMISSION_HIT_QUEUE_TIMEOUT_MS,
+                settings.ADMISSION_HIT_TARGET_LATENCY_MS
+            ),
+            "miss": AdaptiveLimiter(
+                "miss",
+                settings.ADMISSION_MISS_LIMIT,
+                settings.ADMISSION_MISS_MAX_LIMIT,
+                settings.ADMISSION_MISS_QUEUE_TIMEOUT_MS,
+                settings.ADMISSION_MISS_TARGET_LATENCY_MS
+            )
+        }
+
+    @asynccontextmanager
+    async def admit(self, lane: str):
+        """Run a block inside a lane, raising AdmissionRejected when shed"""
+        limiter = self.lanes[lane]
+        await limiter.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            limiter.release(time.monotonic() - started)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {lane: limiter.get_stats() for lane, limiter in self.lanes.items()}
@@ -23,18 +23,109 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379"
     CACHE_TTL: int = 3600
 
+    # Warm-start cache snapshots
+    CACHE_SNAPSHOT_ENABLED: bool = True
+    CACHE_SNAPSHOT_PATH: str = "data/cache-snapshot.ndjson.gz"
+    CACHE_SNAPSHOT_INTERVAL: int = 300
+    CACHE_SNAPSHOT_MAX_ENTRIES: int = 50000
+    CACHE_SNAPSHOT_BATCH_SIZE: int = 1000
+
+    # IPv6 prefix caching (0 disables the tier)
+    IPV6_CACHE_PREFIX_LENGTH: int = 0
+    IPV6_CACHE_PARENT_PREFIX_LENGTH: int = 56
+    IPV6_CACHE_INHERIT_PARENT: bool = False
+
     # External APIs
     ABUSEIPDB_API_KEY: Optional[str] = None
     OTX_API_KEY: Optional[str] = None
     GOOGLE_SAFE_BROWSING_API_KEY: Optional[str] = None
 
+    # Local GeoIP enrichment (MMDB files, reopened when replaced)
+    GEOIP_COUNTRY_DB_PATH: Optional[str] = None
+    GEOIP_ASN_DB_PATH: Optional[str] = None
+    GEOIP_RELOAD_CHECK_SECONDS: int = 30
+
+    # Provider aggregation
+    ABUSEIPDB_WEIGHT: float = 1.0
+    OTX_WEIGHT: float = 0.7
+    GOOGLE_SAFE_BROWSING_WEIGHT: float = 0.3
+    AGGREGATION_EARLY_EXIT: bool = True
+    # Share of total weight needed to exit early on a malicious verdict
+    AGGREGATION_EARLY_EXIT_MIN_WEIGHT: float = 0.5
+    AGGREGATION_EXPENSIVE_DELAY_MS: int = 150
+
+    # Known-safe / known-malicious verdict filters
+    BLOOM_FILTERS_ENABLED: bool = True
+    BLOOM_CAPACITY: int = 1000000
+    BLOOM_ERROR_RATE: float = 0.001
+    BLOOM_MIN_CONFIDENCE: float = 0.5
+    BLOOM_REFRESH_SECONDS: int = 30
+    # Filter generation lifetime, capped at CACHE_TTL
+    BLOOM_MAX_AGE_SECONDS: int = 3600
+
     # Kafka
     KAFKA_BOOTSTRAP_SERVERS: str = "localhost:9092"
     KAFKA_TOPIC_SUSPICIOUS_CALLS: str = "suspicious-calls"
 
+    # Kafka scoring worker
+    KAFKA_WORKER_INPUT_TOPIC: str = "call-setup-events"
+    KAFKA_WORKER_OUTPUT_TOPIC: str = "call-verdicts"
+    KAFKA_WORKER_GROUP_ID: str = "callerwatch-scoring"
+    KAFKA_WORKER_BATCH_SIZE: int = 500
+    KAFKA_WORKER_POLL_TIMEOUT_MS: int = 1000
+    KAFKA_WORKER_DEAD_LETTER_TOPIC: str = "call-setup-events-dlq"
+    KAFKA_WORKER_MAX_RETRIES: int = 3
+
+    # Maximum concurrent provider calls for bulk checks
+    PROVIDER_MAX_CONCURRENCY: int = 10
+
+    # Offline batch scoring CLI
+    BATCH_CHUNK_SIZE: int = 5000
+    BATCH_PROVIDER_RATE_PER_SECOND: float = 10.0
+
+    # Velocity counters (windows in seconds). A burst is at least the minimum count in
+    # the shortest window and VELOCITY_BURST_RATIO times the key's rate over the longest
+    VELOCITY_ENABLED: bool = True
+    VELOCITY_WINDOWS: List[int] = [60, 600, 3600]
+    VELOCITY_BUCKETS_PER_WINDOW: int = 6
+    VELOCITY_FLUSH_INTERVAL_MS: int = 1000
+    VELOCITY_BURST_RATIO: float = 5.0
+    VELOCITY_IP_BURST_MIN: int = 1000
+    VELOCITY_CALLER_BURST_MIN: int = 60
+
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 100
 
+    # Admission control ("reject" answers 503, "degrade" an unknown verdict)
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_SHED_MODE: str = "reject"
+    ADMISSION_MIN_LIMIT: int = 2
+    ADMISSION_MAX_QUEUE: int = 100
+    # Window latency up to this multiple of the minimum observed latency does not shrink a lane
+    ADMISSION_LATENCY_TOLERANCE: float = 2.0
+    ADMISSION_MIN_LATENCY_SECONDS: int = 300
+    ADMISSION_HIT_LIMIT: int = 200
+    ADMISSION_HIT_MAX_LIMIT: int = 1000
+    ADMISSION_HIT_QUEUE_TIMEOUT_MS: int = 50
+    ADMISSION_HIT_TARGET_LATENCY_MS: int = 20
+    ADMISSION_MISS_LIMIT: int = 20
+    ADMISSION_MISS_MAX_LIMIT: int = 100
+    ADMISSION_MISS_QUEUE_TIMEOUT_MS: int = 500
+    ADMISSION_MISS_TARGET_LATENCY_MS: int = 2000
+
+    # WebSocket check channel (per connection)
+    WS_MAX_IN_FLIGHT: int = 32
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0
+
+    # Profiling and event-loop monitoring
+    PROFILING_ENABLED: bool = True
+    PROFILER_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILER_MAX_SECONDS: int = 30
+    PROFILER_STORED_PROFILES: int = 20
+    LOOP_LAG_MONITOR_ENABLED: bool = True
+    LOOP_LAG_INTERVAL_MS: int = 250
+    LOOP_LAG_THRESHOLD_MS: int = 100
+
     # CORS
     ALLOWED_ORIGINS: List[str] = ["*"]
 
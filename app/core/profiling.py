@@ -0,0 +1,161 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _fold_stack(frame) -> str:
+    """Render a frame chain in collapsed (flame graph) format, root first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Sample one thread's stack from a background thread
+
+    Output is in the collapsed-stack format understood by flamegraph.pl,
+    speedscope and similar tools. Nothing runs while the sampler is stopped.
+    """
+
+    def __init__(self, thread_id: int, interval: float = None):
+        self.thread_id = thread_id
+        self.interval = interval or settings.PROFILER_SAMPLE_INTERVAL_MS / 1000
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[_fold_stack(frame)] += 1
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+
+class ProfileStore:
+    """Keep the most recent request profiles in memory"""
+
+    def __init__(self, max_profiles: int = None):
+        self.max_profiles = max_profiles or settings.PROFILER_STORED_PROFILES
+        self._profiles: "OrderedDict[str, str]" = OrderedDict()
+        # Only one request is profiled at a time to bound the overhead
+        self.busy = False
+
+    def add(self, profile_id: str, folded: str):
+        self._profiles[profile_id] = folded
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[str]:
+        return self._profiles.get(profile_id)
+
+
+class LoopLagMonitor:
+    """Measure event-loop lag and capture the stack of slow callbacks
+
+    A heartbeat task records how late each wakeup is. A watchdog thread
+    notices when the heartbeat stalls beyond the threshold and snapshots
+    the loop thread's stack, which is the blocking callback.
+    """
+
+    def __init__(self, interval_ms: int = None, threshold_ms: int = None, max_events: int = 50):
+        self.interval = (interval_ms or settings.LOOP_LAG_INTERVAL_MS) / 1000
+        self.threshold = (threshold_ms or settings.LOOP_LAG_THRESHOLD_MS) / 1000
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.slow_callbacks = 0
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._last_beat = time.monotonic()
+        self._beats = 0
+        self._captured_beat = -1
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watchdog, name="loop-lag-watchdog", daemon=True).start()
+        logger.info("Event loop lag monitor started")
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - started - self.interval, 0.0)
+            self._last_beat = time.monotonic()
+            self._beats += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.slow_callbacks += 1
+                logger.warning(f"Event loop lagged {lag * 1000:.1f}ms")
+
+    def _watchdog(self):
+        while not self._stop.wait(self.interval):
+            stalled = time.monotonic() - self._last_beat - self.interval
+            if stalled <= self.threshold or self._captured_beat == self._beats:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            self._captured_beat = self._beats
+            self.events.append({
+                "timestamp": datetime.utcnow().isoformat(),
+                "stalled_ms": round(stalled * 1000, 1),
+                "stack": traceback.format_stack(frame)
+            })
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "slow_callbacks": self.slow_callbacks,
+            "recent_slow_stacks": list(self.events)
+        }
+
+
+profile_store = ProfileStore()
+loop_lag_monitor = LoopLagMonitor()
@@ -1,5 +1,5 @@
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, WebSocket, WebSocketException, status, Depends
 from passlib.context import CryptContext
 import jwt
 from datetime import datetime, timedelta, timezone
@@ -47,7 +47,7 @@ class SecurityService:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token expired"
             )
-        except jwt.JWTError:
+        except jwt.InvalidTokenError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
@@ -63,3 +63,37 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
 
     return SecurityService.decode_jwt_token(credentials.credentials)
+
+
+async def get_current_admin(current_user: TokenPayload = Depends(get_current_user)) -> TokenPayload:
+    """Get current authenticated user, requiring the admin role"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required"
+        )
+    return current_user
+
+
+async def get_websocket_user(websocket: WebSocket) -> TokenPayload:
+    """Authenticate a WebSocket connection once, from the Authorization header or ?token="""
+    token = None
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    else:
+        token = websocket.query_params.get("token")
+
+    if not token:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION,
+            reason="Authentication required"
+        )
+
+    try:
+        return SecurityService.decode_jwt_token(token)
+    except HTTPException as e:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION,
+            reason=e.detail
+        )
@@ -1,10 +1,22 @@
 from app.services.security_service import SecurityService
 from app.services.ip_checker_service import IPCheckerService
+from app.services.verdict_filter_service import VerdictFilterService
+from app.services.cache_snapshot_service import CacheSnapshotService
+from app.services.geoip_service import GeoIPService
+from app.services.velocity_service import VelocityService
+from app.core.config import settings
+from app.core.admission import AdmissionController
 from app.repositories.cache_repository import CacheRepository
+from typing import Optional
 
 # Global instances (consider using dependency injection container in production)
 _cache_repo = None
 _ip_checker = None
+_verdict_filters = None
+_cache_snapshots = None
+_admission = None
+_geoip = None
+_velocity = None
 _security_service = None
 
 
@@ -25,11 +37,57 @@ async def get_ip_checker_service() -> IPCheckerService:
     return _ip_checker
 
 
+async def get_verdict_filter_service() -> Optional[VerdictFilterService]:
+    """Get verdict filter service instance, or None when disabled"""
+    global _verdict_filters
+    if _verdict_filters is None and settings.BLOOM_FILTERS_ENABLED:
+        _verdict_filters = VerdictFilterService(await get_cache_repository())
+    return _verdict_filters
+
+
+async def get_cache_snapshot_service() -> Optional[CacheSnapshotService]:
+    """Get cache snapshot service instance, or None when disabled"""
+    global _cache_snapshots
+    if _cache_snapshots is None and settings.CACHE_SNAPSHOT_ENABLED:
+        _cache_snapshots = CacheSnapshotService(
+            await get_cache_repository(), await get_verdict_filter_service())
+    return _cache_snapshots
+
+
+async def get_admission_controller() -> Optional[AdmissionController]:
+    """Get admission controller instance, or None when disabled"""
+    global _admission
+    if _admission is None and settings.ADMISSION_CONTROL_ENABLED:
+        _admission = AdmissionController()
+    return _admission
+
+
+async def get_geoip_service() -> Optional[GeoIPService]:
+    """Get GeoIP service instance, or None when no database is configured"""
+    global _geoip
+    if _geoip is None and (settings.GEOIP_COUNTRY_DB_PATH or settings.GEOIP_ASN_DB_PATH):
+        _geoip = GeoIPService()
+    return _geoip
+
+
+async def get_velocity_service() -> Optional[VelocityService]:
+    """Get velocity service instance, or None when disabled"""
+    global _velocity
+    if _velocity is None and settings.VELOCITY_ENABLED:
+        _velocity = VelocityService(await get_cache_repository())
+    return _velocity
+
+
 async def get_security_service() -> SecurityService:
     """Get security service instance"""
     global _security_service
     if _security_service is None:
         cache_repo = await get_cache_repository()
         ip_checker = await get_ip_checker_service()
-        _security_service = SecurityService(cache_repo, ip_checker)
+        verdict_filters = await get_verdict_filter_service()
+        admission = await get_admission_controller()
+        geoip = await get_geoip_service()
+        velocity = await get_velocity_service()
+        _security_service = SecurityService(
+            cache_repo, ip_checker, verdict_filters, admission, geoip, velocity)
     return _security_service
@@ -0,0 +1,64 @@
+import threading
+import uuid
+import logging
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.profiling import StackSampler, profile_store
+from app.core.security import SecurityService
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    """Profile requests carrying ``X-Profile: 1`` and an admin bearer token
+
+    The event loop thread is sampled for the duration of the request, so
+    concurrent requests show up in the profile too. The collapsed stacks are
+    stored and their ID returned in the ``X-Profile-Id`` response header.
+    Requests without the header only pay for a header scan.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") != b"1" or profile_store.busy:
+            return await self.app(scope, receive, send)
+
+        if not self._is_admin(headers.get(b"authorization", b"")):
+            return await self.app(scope, receive, send)
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+
+        profile_store.busy = True
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            profile_store.busy = False
+            profile_store.add(profile_id, sampler.folded())
+            logger.info(f"Stored profile {profile_id} for {scope['path']}")
+
+    def _is_admin(self, authorization: bytes) -> bool:
+        scheme, _, token = authorization.decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        try:
+            return SecurityService.decode_jwt_token(token).role == "admin"
+        except HTTPException:
+            return False
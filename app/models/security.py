@@ -1,5 +1,5 @@
 from pydantic import BaseModel, IPvAnyAddress, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -8,6 +8,7 @@ class ReputationLevel(str, Enum):
     SAFE = "safe"
     SUSPICIOUS = "suspicious"
     MALICIOUS = "malicious"
+    UNKNOWN = "unknown"
 
 
 class RiskLevel(str, Enum):
@@ -28,6 +29,14 @@ class CallerCheckRequest(BaseModel):
     context: Optional[str] = None
 
 
+class StreamCheckRequest(BaseModel):
+    id: str
+    type: Literal["ip", "caller"]
+    ip: Optional[IPvAnyAddress] = None
+    phone_number: Optional[str] = Field(None, min_length=10, max_length=15)
+    context: Optional[str] = None
+
+
 class SecurityScore(BaseModel):
     ip: str
     score: int = Field(..., ge=0, le=100)
@@ -47,6 +56,7 @@ class CallerInfo(BaseModel):
     last_seen: Optional[datetime] = None
     reputation_score: float = Field(..., ge=0.0, le=1.0)
     blocked_count: int = 0
+    velocity: Dict[str, int] = {}
 
 
 class ApiResponse(BaseModel):
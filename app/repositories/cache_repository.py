@@ -1,63 +1,401 @@
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List, Tuple
+import asyncio
+import base64
 import json
+from collections import Counter
 import redis.asyncio as redis
 from app.core.config import settings
 from app.models.security import SecurityScore
+from app.utils.ip_utils import canonicalize_ip, ipv6_prefix
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Prefix keys are shared by every address in the network, so a write only
+# replaces the cached verdict when it is at least as bad (worst score wins)
+SET_WORST_SCORE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local ok, cached = pcall(cjson.decode, current)
+    if ok and tonumber(cached['score']) and tonumber(cached['score']) > tonumber(ARGV[1]) then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
 
 class CacheRepository:
     """Repository for Redis cache operations"""
 
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
+        self.stats: Dict[str, int] = {
+            "exact_hits": 0,
+            "prefix_hits": 0,
+            "misses": 0
+        }
+        # Access frequency per cache key, used to pick the warm-start hot set;
+        # only tracked while a snapshot service drains it periodically
+        self.access_counts: Counter = Counter()
+        self.track_access = False
+        self._set_worst_score = None
 
     async def connect(self):
         """Connect to Redis"""
         self.redis_client = redis.from_url(
             settings.REDIS_URL, decode_responses=True)
+        self._set_worst_score = self.redis_client.register_script(SET_WORST_SCORE_SCRIPT)
 
     async def disconnect(self):
         """Disconnect from Redis"""
         if self.redis_client:
             await self.redis_client.close()
 
+    def _ip_cache_keys(self, ip: str) -> List[Tuple[str, str]]:
+        """Build (tier, key) pairs for an IP, most specific first"""
+        keys = [("exact", f"ip_score:{ip}")]
+
+        prefix = ipv6_prefix(ip, settings.IPV6_CACHE_PREFIX_LENGTH)
+        if prefix:
+            keys.append(("prefix", f"ip_prefix_score:{prefix}"))
+
+        if settings.IPV6_CACHE_INHERIT_PARENT:
+            parent = ipv6_prefix(ip, settings.IPV6_CACHE_PARENT_PREFIX_LENGTH)
+            if parent and parent != prefix:
+                keys.append(("prefix", f"ip_prefix_score:{parent}"))
+
+        return keys
+
+    def _resolve_cached(self, ip: str, keys: List[Tuple[str, str]],
+                        values: List[Optional[str]]) -> Optional[SecurityScore]:
+        """Pick the most specific cached score for an IP and update hit stats"""
+        for (tier, key), cached_data in zip(keys, values):
+            if not cached_data:
+                continue
+
+            score = SecurityScore(**json.loads(cached_data))
+            if self.track_access:
+                self.access_counts[key] += 1
+            if tier == "exact":
+                self.stats["exact_hits"] += 1
+                return score
+
+            self.stats["prefix_hits"] += 1
+            return score.model_copy(update={
+                "ip": ip,
+                "details": {
+                    **score.details,
+                    "cache_prefix": key.split(":", 1)[1]
+                }
+            })
+
+        self.stats["misses"] += 1
+        return None
+
     async def get_ip_score(self, ip: str) -> Optional[SecurityScore]:
-        """Get IP security score from cache"""
+        """Get IP security score from cache, falling back to IPv6 prefix keys"""
         try:
             if not self.redis_client:
                 return None
 
-            cached_data = await self.redis_client.get(f"ip_score:{ip}")
-            if cached_data:
-                data = json.loads(cached_data)
-                return SecurityScore(**data)
+            ip = canonicalize_ip(ip)
+            keys = self._ip_cache_keys(ip)
+            values = await self.redis_client.mget([key for _, key in keys])
+            return self._resolve_cached(ip, keys, values)
         except Exception as e:
             logger.error(f"Error getting IP score from cache: {e}")
         return None
 
-    async def set_ip_score(self, score: SecurityScore, ttl: int = None) -> bool:
-        """Set IP security score in cache"""
+    async def get_ip_scores(self, ips: List[str]) -> Dict[str, Optional[SecurityScore]]:
+        """Get cached scores for many IPs with a single MGET"""
+        results: Dict[str, Optional[SecurityScore]] = {ip: None for ip in ips}
+        try:
+            if not self.redis_client or not ips:
+                return results
+
+            ip_keys = [(ip, self._ip_cache_keys(canonicalize_ip(ip))) for ip in ips]
+            flat_keys = [key for _, keys in ip_keys for _, key in keys]
+            values = await self.redis_client.mget(flat_keys)
+
+            offset = 0
+            for ip, keys in ip_keys:
+                chunk = values[offset:offset + len(keys)]
+                offset += len(keys)
+                results[ip] = self._resolve_cached(canonicalize_ip(ip), keys, chunk)
+        except Exception as e:
+            logger.error(f"Error getting IP scores from cache: {e}")
+        return results
+
+    async def set_ip_score(self, score: SecurityScore, ttl: int = None,
+                           update_prefix: bool = True) -> bool:
+        """Set IP security score in cache under the exact and prefix keys"""
+        return await self.set_ip_scores([score], ttl, update_prefix)
+
+    async def set_ip_scores(self, scores: List[SecurityScore], ttl: int = None,
+                            update_prefix: bool = True) -> bool:
+        """Set many IP security scores in one pipelined round-trip
+
+        Exact keys are overwritten; prefix keys keep the worst score seen, and
+        are left alone when update_prefix is False (e.g. on a forced refresh).
+        """
         try:
             if not self.redis_client:
                 return False
 
             cache_ttl = ttl or settings.CACHE_TTL
-            data = score.model_dump()
-            data['last_updated'] = data['last_updated'].isoformat()
-
-            await self.redis_client.setex(
-                f"ip_score:{score.ip}",
-                cache_ttl,
-                json.dumps(data)
-            )
+            pipe = self.redis_client.pipeline(transaction=False)
+            for score in scores:
+                data = score.model_dump()
+                data['last_updated'] = data['last_updated'].isoformat()
+                payload = json.dumps(data)
+
+                for tier, key in self._ip_cache_keys(canonicalize_ip(score.ip)):
+                    if tier == "exact":
+                        pipe.setex(key, cache_ttl, payload)
+                    elif update_prefix:
+                        await self._set_worst_score(
+                            keys=[key], args=[score.score, payload, cache_ttl], client=pipe)
+            await pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Error setting IP score in cache: {e}")
             return False
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit statistics, reporting the prefix tier separately"""
+        total = sum(self.stats.values())
+        return {
+            **self.stats,
+            "lookups": total,
+            "exact_hit_rate": self.stats["exact_hits"] / total if total else 0.0,
+            "prefix_hit_rate": self.stats["prefix_hits"] / total if total else 0.0,
+            "hit_rate": (self.stats["exact_hits"] + self.stats["prefix_hits"]) / total if total else 0.0
+        }
+
+    async def get_entries_with_ttl(self, keys: List[str]) -> List[Tuple[str, str, int]]:
+        """Get (key, value, remaining TTL in ms) for existing keys in one round-trip"""
+        try:
+            if not self.redis_client or not keys:
+                return []
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.get(key)
+                pipe.pttl(key)
+            values = await pipe.execute()
+
+            return [
+                (key, value, ttl)
+                for key, value, ttl in zip(keys, values[::2], values[1::2])
+                if value is not None and ttl > 0
+            ]
+        except Exception as e:
+            logger.error(f"Error reading cache entries: {e}")
+            return []
+
+    async def load_entries(self, entries: List[Tuple[str, str, int]]) -> int:
+        """Write (key, value, TTL in ms) entries without overwriting newer data"""
+        try:
+            if not self.redis_client or not entries:
+                return 0
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value, ttl in entries:
+                pipe.set(key, value, px=ttl, nx=True)
+            results = await pipe.execute()
+            return sum(1 for result in results if result)
+        except Exception as e:
+            logger.error(f"Error loading cache entries: {e}")
+            return 0
+
+    async def add_access_counts(self, counts: Dict[str, int]) -> bool:
+        """Merge local key access counts into the shared hot-set ranking"""
+        try:
+            if not self.redis_client or not counts:
+                return False
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, count in counts.items():
+                pipe.zincrby("cache_snapshot:access_counts", count, key)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error recording cache access counts: {e}")
+            return False
+
+    async def get_hot_keys(self, limit: int) -> List[str]:
+        """Get the most frequently accessed cache keys across all workers"""
+        try:
+            if not self.redis_client:
+                return []
+
+            return await self.redis_client.zrevrange("cache_snapshot:access_counts", 0, limit - 1)
+        except Exception as e:
+            logger.error(f"Error getting hot cache keys: {e}")
+            return []
+
+    async def decay_access_counts(self, max_entries: int) -> bool:
+        """Halve the shared access counts and keep only the top max_entries keys"""
+        try:
+            if not self.redis_client:
+                return False
+
+            key = "cache_snapshot:access_counts"
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.zunionstore(key, {key: 0.5})
+            pipe.zremrangebyscore(key, "-inf", "(1")
+            pipe.zremrangebyrank(key, 0, -max_entries - 1)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error decaying cache access counts: {e}")
+            return False
+
+    async def add_filter_candidates(self, kind: str, ips: List[str]) -> bool:
+        """Queue IPs for the next verdict filter rebuild"""
+        try:
+            if not self.redis_client or not ips:
+                return False
+
+            await self.redis_client.sadd(f"verdict_filter:pending:{kind}", *ips)
+            return True
+        except Exception as e:
+            logger.error(f"Error queueing verdict filter candidates: {e}")
+            return False
+
+    async def drain_filter_candidates(self, kind: str) -> List[str]:
+        """Atomically take all queued verdict filter candidates"""
+        try:
+            if not self.redis_client:
+                return []
+
+            key = f"verdict_filter:pending:{kind}"
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.smembers(key)
+            pipe.delete(key)
+            members, _ = await pipe.execute()
+            return list(members)
+        except Exception as e:
+            logger.error(f"Error draining verdict filter candidates: {e}")
+            return []
+
+    async def acquire_lock(self, name: str, ttl: int) -> bool:
+        """Try to take a best-effort lock that expires after ttl seconds"""
+        try:
+            if not self.redis_client:
+                return False
+
+            return bool(await self.redis_client.set(f"lock:{name}", "1", nx=True, ex=ttl))
+        except Exception as e:
+            logger.error(f"Error acquiring lock {name}: {e}")
+            return False
+
+    async def get_filter_versions(self) -> Tuple[int, int]:
+        """Get the latest verdict filter version and the version its generation started at"""
+        try:
+            if not self.redis_client:
+                return 0, 0
+
+            version, base = await self.redis_client.mget(
+                ["verdict_filter:version", "verdict_filter:base"])
+            return int(version or 0), int(base or 0)
+        except Exception as e:
+            logger.error(f"Error getting verdict filter version: {e}")
+            return 0, 0
+
+    async def get_filter_snapshot(self, kind: str, version: int) -> Optional[bytes]:
+        """Get a published verdict filter snapshot"""
+        try:
+            if not self.redis_client:
+                return None
+
+            data = await self.redis_client.get(f"verdict_filter:{kind}:{version}")
+            return await asyncio.to_thread(base64.b64decode, data) if data else None
+        except Exception as e:
+            logger.error(f"Error getting verdict filter snapshot: {e}")
+            return None
+
+    async def publish_filter_snapshots(self, version: int, snapshots: Dict[str, bytes], ttl: int) -> bool:
+        """Publish the full filters that start a generation and bump the version atomically"""
+        try:
+            if not self.redis_client:
+                return False
+
+            encoded = await asyncio.to_thread(
+                lambda: {kind: base64.b64encode(data).decode() for kind, data in snapshots.items()})
+            pipe = self.redis_client.pipeline(transaction=True)
+            for kind, data in encoded.items():
+                pipe.setex(f"verdict_filter:{kind}:{version}", ttl, data)
+            pipe.set("verdict_filter:base", version)
+            pipe.set("verdict_filter:version", version)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error publishing verdict filter snapshots: {e}")
+            return False
+
+    async def publish_filter_delta(self, version: int, delta: Dict[str, List[str]], ttl: int) -> bool:
+        """Publish the IPs added to the filters in a version and bump the version atomically"""
+        try:
+            if not self.redis_client:
+                return False
+
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.setex(f"verdict_filter:delta:{version}", ttl, json.dumps(delta))
+            pipe.set("verdict_filter:version", version)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error publishing verdict filter delta: {e}")
+            return False
+
+    async def get_filter_deltas(self, versions: List[int]) -> List[Optional[Dict[str, List[str]]]]:
+        """Get the IPs added in each version with one MGET (None where expired)"""
+        try:
+            if not self.redis_client or not versions:
+                return [None for _ in versions]
+
+            values = await self.redis_client.mget(
+                [f"verdict_filter:delta:{version}" for version in versions])
+            return [json.loads(value) if value else None for value in values]
+        except Exception as e:
+            logger.error(f"Error getting verdict filter deltas: {e}")
+            return [None for _ in versions]
+
+    async def apply_bucket_increments(self, increments: List[Tuple[str, int, int, int, int]]) -> bool:
+        """Apply (hash key, bucket, count, stale bucket, ttl) bucketed counter updates in one pipeline"""
+        try:
+            if not self.redis_client or not increments:
+                return False
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, bucket, count, stale_bucket, ttl in increments:
+                pipe.hincrby(key, bucket, count)
+                pipe.hdel(key, stale_bucket)
+                pipe.expire(key, ttl)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error applying counter increments: {e}")
+            return False
+
+    async def get_bucket_hashes(self, keys: List[str]) -> List[Dict[int, int]]:
+        """Read bucketed counter hashes in one pipeline"""
+        try:
+            if not self.redis_client or not keys:
+                return [{} for _ in keys]
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hgetall(key)
+            hashes = await pipe.execute()
+            return [{int(bucket): int(count) for bucket, count in data.items()} for data in hashes]
+        except Exception as e:
+            logger.error(f"Error reading counters: {e}")
+            return [{} for _ in keys]
+
     async def increment_counter(self, key: str, ttl: int = 3600) -> int:
         """Increment a counter with TTL"""
         try:
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from app.models.auth import TokenPayload
+from app.models.security import ApiResponse
+from app.core.config import settings
+from app.core.profiling import StackSampler, loop_lag_monitor, profile_store
+from app.core.security import get_current_admin
+import asyncio
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/admin", tags=["Admin"])
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_event_loop(
+    seconds: float = Query(5.0, gt=0),
+    current_user: TokenPayload = Depends(get_current_admin)
+):
+    """Sample the event loop for a while and return collapsed stacks"""
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Profile duration is limited to {settings.PROFILER_MAX_SECONDS}s"
+        )
+
+    logger.info(f"Event loop profile of {seconds}s requested by {current_user.sub}")
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+
+    return sampler.folded()
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_request_profile(
+    profile_id: str,
+    current_user: TokenPayload = Depends(get_current_admin)
+):
+    """Get a stored request profile in collapsed-stack format"""
+    folded = profile_store.get(profile_id)
+    if folded is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return folded
+
+
+@router.get("/loop-lag", response_model=ApiResponse)
+async def get_loop_lag(
+    current_user: TokenPayload = Depends(get_current_admin)
+):
+    """Get event loop lag statistics and recent slow-callback stacks"""
+    return ApiResponse(
+        success=True,
+        data=loop_lag_monitor.get_stats(),
+        message="Event loop lag retrieved successfully"
+    )
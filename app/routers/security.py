@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.models.security import IPCheckRequest, CallerCheckRequest, SecurityScore, CallerInfo, ApiResponse
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from app.models.security import IPCheckRequest, CallerCheckRequest, SecurityScore, CallerInfo, ApiResponse, StreamCheckRequest
 from app.models.auth import TokenPayload
-from app.core.security import get_current_user
+from app.core.config import settings
+from app.core.security import get_current_user, get_websocket_user
+from app.core.admission import AdmissionRejected
 from app.services.security_service import SecurityService
 from app.dependencies import get_security_service
+from typing import Any, Dict, Set
+import asyncio
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,6 +17,16 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/security", tags=["Security"])
 
 
+def _service_unavailable(error: AdmissionRejected) -> HTTPException:
+    """Build the 503 returned when a request is shed by admission control"""
+    logger.warning(f"Request shed: {error}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Service overloaded, please retry later",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
 @router.post("/check/ip", response_model=ApiResponse)
 async def check_ip_security(
     request: IPCheckRequest,
@@ -33,6 +49,8 @@ async def check_ip_security(
             message="IP check completed successfully"
         )
 
+    except AdmissionRejected as e:
+        raise _service_unavailable(e)
     except Exception as e:
         logger.error(f"Error checking IP {request.ip}: {e}")
         raise HTTPException(
@@ -63,6 +81,8 @@ async def check_caller_info(
             message="Caller check completed successfully"
         )
 
+    except AdmissionRejected as e:
+        raise _service_unavailable(e)
     except Exception as e:
         logger.error(f"Error checking caller {request.phone_number}: {e}")
         raise HTTPException(
@@ -73,18 +93,21 @@ async def check_caller_info(
 
 @router.get("/stats", response_model=ApiResponse)
 async def get_security_stats(
+    security_service: SecurityService = Depends(get_security_service),
     current_user: TokenPayload = Depends(get_current_user)
 ):
     """Get security statistics"""
     try:
         # Placeholder for real statistics
+        runtime_stats = security_service.get_stats()
         stats = {
             "total_ips_checked": 1000,
             "total_callers_checked": 500,
-            "cache_hit_rate": 0.85,
+            "cache_hit_rate": runtime_stats["cache"]["hit_rate"],
             "avg_response_time": 150.5,
             "top_threats": [],
-            "recent_activity": []
+            "recent_activity": [],
+            **runtime_stats
         }
 
         return ApiResponse(
@@ -99,3 +122,116 @@ async def get_security_stats(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error getting statistics"
         )
+
+
+async def _handle_stream_check(raw: str, security_service: SecurityService) -> Dict[str, Any]:
+    """Run one pipelined check received on the WebSocket channel"""
+    message_id = None
+    try:
+        message = StreamCheckRequest(**json.loads(raw))
+        message_id = message.id
+
+        if message.type == "ip":
+            if not message.ip:
+                raise ValueError("Field 'ip' is required for ip checks")
+            result = await security_service.check_ip_security(str(message.ip))
+        else:
+            if not message.phone_number:
+                raise ValueError("Field 'phone_number' is required for caller checks")
+            result = await security_service.check_caller_info(
+                message.phone_number,
+                str(message.ip) if message.ip else None
+            )
+
+        response = ApiResponse(
+            success=True,
+            data=result.model_dump(),
+            message=f"{message.type.capitalize()} check completed successfully"
+        )
+    except (ValueError, TypeError, ValidationError) as e:
+        # TypeError: the message is valid JSON but not an object
+        response = ApiResponse(success=False, message=f"Invalid check message: {e}")
+    except AdmissionRejected as e:
+        response = ApiResponse(
+            success=False,
+            data={"retry_after": e.retry_after},
+            message="Service overloaded, please retry later"
+        )
+    except Exception as e:
+        logger.error(f"Error processing stream check {message_id}: {e}")
+        response = ApiResponse(success=False, message="Internal server error during check")
+
+    return {"id": message_id, **response.model_dump(mode="json")}
+
+
+@router.websocket("/ws")
+async def security_check_stream(
+    websocket: WebSocket,
+    security_service: SecurityService = Depends(get_security_service),
+    current_user: TokenPayload = Depends(get_websocket_user)
+):
+    """Stream pipelined IP and caller checks over one authenticated connection"""
+    await websocket.accept()
+    logger.info(f"Check stream opened by user {current_user.sub}")
+
+    in_flight = asyncio.Semaphore(settings.WS_MAX_IN_FLIGHT)
+    send_lock = asyncio.Lock()
+    closed = asyncio.Event()
+    tasks: Set[asyncio.Task] = set()
+
+    async def close_stream():
+        """Close the connection once, however many sends time out together"""
+        if closed.is_set():
+            return
+        closed.set()
+        try:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        except Exception as e:
+            logger.debug(f"Error closing check stream: {e}")
+
+    async def process(raw: str):
+        try:
+            response = await _handle_stream_check(raw, security_service)
+            async with send_lock:
+                if closed.is_set():
+                    return
+                await asyncio.wait_for(
+                    websocket.send_json(response),
+                    timeout=settings.WS_SEND_TIMEOUT_SECONDS
+                )
+        except asyncio.TimeoutError:
+            logger.warning(f"Check stream client {current_user.sub} is not reading, closing")
+            await close_stream()
+        except Exception as e:
+            logger.error(f"Error sending stream check result: {e}")
+        finally:
+            in_flight.release()
+
+    closing = asyncio.create_task(closed.wait())
+    try:
+        while True:
+            # Stop reading at the in-flight cap so backpressure reaches the client
+            await in_flight.acquire()
+            receive = asyncio.create_task(websocket.receive_text())
+            try:
+                await asyncio.wait({receive, closing}, return_when=asyncio.FIRST_COMPLETED)
+                if not receive.done():
+                    # Closed after a send timeout: stop reading and starting checks
+                    receive.cancel()
+                    in_flight.release()
+                    break
+                raw = receive.result()
+            except BaseException:
+                receive.cancel()
+                in_flight.release()
+                raise
+
+            task = asyncio.create_task(process(raw))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        logger.info(f"Check stream closed by user {current_user.sub}")
+    finally:
+        closing.cancel()
+        for task in tasks:
+            task.cancel()
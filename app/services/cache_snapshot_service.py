@@ -0,0 +1,156 @@
+from app.core.config import settings
+from app.models.security import SecurityScore
+from app.repositories.cache_repository import CacheRepository
+from app.services.verdict_filter_service import VerdictFilterService
+from collections import Counter
+from itertools import islice
+from typing import Optional
+import asyncio
+import gzip
+import json
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CacheSnapshotService:
+    """Dump the hot set of cached scores to disk and reload it on startup
+
+    The snapshot is a gzipped NDJSON file with one ``{"key", "value",
+    "expires_at"}`` record per line, ordered by access frequency across all
+    workers. Both dump and load work in batches of CACHE_SNAPSHOT_BATCH_SIZE,
+    so memory stays bounded regardless of the snapshot size.
+    """
+
+    def __init__(self, cache_repo: CacheRepository,
+                 verdict_filters: Optional[VerdictFilterService] = None,
+                 path: str = None):
+        self.cache_repo = cache_repo
+        self.verdict_filters = verdict_filters
+        self.path = path or settings.CACHE_SNAPSHOT_PATH
+        self._task: Optional[asyncio.Task] = None
+
+    async def dump(self, final: bool = False) -> int:
+        """Write the most frequently accessed cache entries to the snapshot file
+
+        Every worker merges its access counts into a shared Redis ranking;
+        only the worker holding the dump lock writes the file.
+        """
+        counts, self.cache_repo.access_counts = self.cache_repo.access_counts, Counter()
+        await self.cache_repo.add_access_counts(counts)
+
+        if final:
+            # One final dump per shutdown, even right after a periodic one
+            acquired = await self.cache_repo.acquire_lock("cache_snapshot_final_dump", 60)
+        else:
+            acquired = await self.cache_repo.acquire_lock(
+                "cache_snapshot_dump", max(1, settings.CACHE_SNAPSHOT_INTERVAL - 1))
+        if not acquired:
+            return 0
+
+        max_entries = settings.CACHE_SNAPSHOT_MAX_ENTRIES
+        hot_keys = await self.cache_repo.get_hot_keys(max_entries)
+        # Halve counts so the hot set follows recent traffic, and bound the ranking
+        await self.cache_repo.decay_access_counts(max_entries * 2)
+
+        if not hot_keys:
+            return 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        written = 0
+        now = time.time()
+        handle = await asyncio.to_thread(gzip.open, tmp_path, "wt", encoding="utf-8")
+        try:
+            batch_size = settings.CACHE_SNAPSHOT_BATCH_SIZE
+            for start in range(0, len(hot_keys), batch_size):
+                entries = await self.cache_repo.get_entries_with_ttl(
+                    hot_keys[start:start + batch_size])
+                lines = "".join(
+                    json.dumps({"key": key, "value": value, "expires_at": now + ttl / 1000}) + "\n"
+                    for key, value, ttl in entries
+                )
+                await asyncio.to_thread(handle.write, lines)
+                written += len(entries)
+            await asyncio.to_thread(handle.close)
+        except BaseException:
+            await asyncio.to_thread(handle.close)
+            os.remove(tmp_path)
+            raise
+
+        os.replace(tmp_path, self.path)
+        logger.info(f"Cache snapshot written: {written} entries to {self.path}")
+        return written
+
+    async def load(self) -> int:
+        """Stream the snapshot file back into Redis and the local filters"""
+        if not os.path.exists(self.path):
+            logger.info("No cache snapshot found, starting cold")
+            return 0
+
+        loaded = 0
+        skipped = 0
+        handle = await asyncio.to_thread(gzip.open, self.path, "rt", encoding="utf-8")
+        try:
+            while True:
+                lines = await asyncio.to_thread(
+                    lambda: list(islice(handle, settings.CACHE_SNAPSHOT_BATCH_SIZE)))
+                if not lines:
+                    break
+
+                now = time.time()
+                entries = []
+                scores = []
+                for line in lines:
+                    record = json.loads(line)
+                    ttl_ms = int((record["expires_at"] - now) * 1000)
+                    if ttl_ms <= 0:
+                        skipped += 1
+                        continue
+
+                    entries.append((record["key"], record["value"], ttl_ms))
+                    if record["key"].startswith("ip_score:"):
+                        scores.append((SecurityScore(**json.loads(record["value"])), ttl_ms))
+
+                loaded += await self.cache_repo.load_entries(entries)
+                if self.verdict_filters:
+                    self.verdict_filters.warm(scores)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading cache snapshot: {e}")
+        finally:
+            await asyncio.to_thread(handle.close)
+
+        logger.info(f"Cache warm-start loaded {loaded} entries ({skipped} expired)")
+        return loaded
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.CACHE_SNAPSHOT_INTERVAL)
+            try:
+                await self.dump()
+            except Exception as e:
+                logger.error(f"Error writing cache snapshot: {e}")
+
+    def start(self):
+        """Start tracking cache accesses and periodic snapshot dumps"""
+        self.cache_repo.track_access = True
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop periodic dumps and write a final snapshot"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.dump(final=True)
+        except Exception as e:
+            logger.error(f"Error writing cache snapshot: {e}")
+        self.cache_repo.track_access = False
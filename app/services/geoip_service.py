@@ -0,0 +1,89 @@
+from app.core.config import settings
+from app.utils.mmdb import MMDBReader, InvalidDatabaseError
+from typing import Any, Dict, Optional, Tuple
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class GeoIPDatabase:
+    """An MMDB file that is reopened when it is replaced on disk"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.reader: Optional[MMDBReader] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._next_check = 0.0
+        self.reload()
+
+    def reload(self):
+        """Swap in the current file if it changed since it was last opened"""
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            logger.warning(f"GeoIP database {self.path} unavailable: {e}")
+            return
+
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if signature == self._signature:
+            return
+
+        try:
+            reader = MMDBReader(self.path)
+        except (OSError, ValueError, KeyError, InvalidDatabaseError) as e:
+            logger.error(f"Error opening GeoIP database {self.path}: {e}")
+            return
+
+        old_reader, self.reader = self.reader, reader
+        self._signature = signature
+        if old_reader:
+            old_reader.close()
+        logger.info(f"GeoIP database loaded: {self.path} ({reader.metadata.get('database_type')})")
+
+    def get(self, ip: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + settings.GEOIP_RELOAD_CHECK_SECONDS
+            self.reload()
+
+        if not self.reader:
+            return None
+        try:
+            record = self.reader.get(ip)
+        except (ValueError, IndexError, InvalidDatabaseError) as e:
+            logger.error(f"GeoIP lookup failed for {ip}: {e}")
+            return None
+        return record if isinstance(record, dict) else None
+
+
+class GeoIPService:
+    """Local country / ASN enrichment from MMDB files (e.g. GeoLite2-Country and GeoLite2-ASN)"""
+
+    def __init__(self, country_db_path: Optional[str] = None, asn_db_path: Optional[str] = None):
+        country_db_path = country_db_path or settings.GEOIP_COUNTRY_DB_PATH
+        asn_db_path = asn_db_path or settings.GEOIP_ASN_DB_PATH
+        self.country_db = GeoIPDatabase(country_db_path) if country_db_path else None
+        self.asn_db = GeoIPDatabase(asn_db_path) if asn_db_path else None
+
+    def lookup(self, ip: str) -> Dict[str, Any]:
+        """Get country and ASN information for an IP; missing fields are omitted"""
+        geo: Dict[str, Any] = {}
+
+        if self.country_db:
+            record = self.country_db.get(ip)
+            if record:
+                country = record.get("country") or record.get("registered_country") or {}
+                if country.get("iso_code"):
+                    geo["country"] = country["iso_code"]
+
+        if self.asn_db:
+            record = self.asn_db.get(ip)
+            if record:
+                if record.get("autonomous_system_number"):
+                    geo["asn"] = record["autonomous_system_number"]
+                if record.get("autonomous_system_organization"):
+                    geo["as_org"] = record["autonomous_system_organization"]
+
+        return geo
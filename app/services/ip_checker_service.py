@@ -1,18 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from enum import Enum
+from typing import Dict, Any, List, Optional
 import httpx
 import asyncio
 from app.core.config import settings
 from app.models.security import SecurityScore, ReputationLevel
+from app.utils.rate_limiter import AsyncRateLimiter
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ProviderCostClass(str, Enum):
+    CHEAP = "cheap"
+    STANDARD = "standard"
+    EXPENSIVE = "expensive"
+
+
 class IPCheckProvider(ABC):
     """Abstract base class for IP checking providers"""
 
+    # Relative weight in the aggregated score
+    weight: float = 1.0
+    # Expensive (quota-bound) providers are started last and cancelled first
+    cost_class: ProviderCostClass = ProviderCostClass.STANDARD
+
     @abstractmethod
     async def check_ip(self, ip: str) -> Dict[str, Any]:
         """Check IP reputation"""
@@ -28,8 +41,11 @@ class IPCheckProvider(ABC):
 class AbuseIPDBProvider(IPCheckProvider):
     """AbuseIPDB provider implementation"""
 
-    def __init__(self, api_key: str):
+    cost_class = ProviderCostClass.EXPENSIVE
+
+    def __init__(self, api_key: str, weight: float = 1.0):
         self.api_key = api_key
+        self.weight = weight
         self.base_url = "https://api.abuseipdb.com/api/v2"
 
     @property
@@ -98,11 +114,135 @@ class AbuseIPDBProvider(IPCheckProvider):
             return {"score": 0, "error": str(e)}
 
 
+class OTXProvider(IPCheckProvider):
+    """AlienVault OTX provider implementation"""
+
+    cost_class = ProviderCostClass.STANDARD
+    # Score added per threat pulse referencing the IP
+    PULSE_SCORE = 10
+
+    def __init__(self, api_key: str, weight: float = 1.0):
+        self.api_key = api_key
+        self.weight = weight
+        self.base_url = "https://otx.alienvault.com/api/v1"
+
+    @property
+    def provider_name(self) -> str:
+        return "otx"
+
+    async def check_ip(self, ip: str) -> Dict[str, Any]:
+        """Check IP using OTX pulse information"""
+        if not self.api_key:
+            logger.warning("OTX API key not configured")
+            return {"score": 0, "error": "API key not configured"}
+
+        section = "IPv6" if ":" in ip else "IPv4"
+
+        try:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.get(
+                    f"{self.base_url}/indicators/{section}/{ip}/general",
+                    headers={"X-OTX-API-KEY": self.api_key}
+                )
+
+                if response.status_code == 200:
+                    data = response.json()
+                    pulses = data.get("pulse_info", {}).get("count", 0)
+                    whitelisted = bool(data.get("validation"))
+                    score = 0 if whitelisted else min(pulses * self.PULSE_SCORE, 100)
+
+                    logger.info(f"OTX score for {ip}: {score} ({pulses} pulses)")
+
+                    return {
+                        "score": score,
+                        "pulses": pulses,
+                        "is_whitelisted": whitelisted,
+                        "country": data.get("country_code"),
+                        "asn": data.get("asn")
+                    }
+                else:
+                    logger.error(f"OTX API error: {response.status_code} - {response.text}")
+                    return {"score": 0, "error": f"HTTP {response.status_code}"}
+
+        except Exception as e:
+            logger.error(f"OTX check failed for {ip}: {e}")
+            return {"score": 0, "error": str(e)}
+
+
+class SafeBrowsingProvider(IPCheckProvider):
+    """Google Safe Browsing provider implementation (IP checked as a URL host)"""
+
+    cost_class = ProviderCostClass.CHEAP
+    THREAT_TYPES = [
+        "MALWARE",
+        "SOCIAL_ENGINEERING",
+        "UNWANTED_SOFTWARE",
+        "POTENTIALLY_HARMFUL_APPLICATION"
+    ]
+
+    def __init__(self, api_key: str, weight: float = 1.0):
+        self.api_key = api_key
+        self.weight = weight
+        self.base_url = "https://safebrowsing.googleapis.com/v4"
+
+    @property
+    def provider_name(self) -> str:
+        return "google_safe_browsing"
+
+    async def check_ip(self, ip: str) -> Dict[str, Any]:
+        """Check IP using the Safe Browsing Lookup API"""
+        if not self.api_key:
+            logger.warning("Google Safe Browsing API key not configured")
+            return {"score": 0, "error": "API key not configured"}
+
+        host = f"[{ip}]" if ":" in ip else ip
+        body = {
+            "client": {
+                "clientId": "callerwatch",
+                "clientVersion": settings.APP_VERSION
+            },
+            "threatInfo": {
+                "threatTypes": self.THREAT_TYPES,
+                "platformTypes": ["ANY_PLATFORM"],
+                "threatEntryTypes": ["URL"],
+                "threatEntries": [{"url": f"http://{host}/"}]
+            }
+        }
+
+        try:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.post(
+                    f"{self.base_url}/threatMatches:find",
+                    params={"key": self.api_key},
+                    json=body
+                )
+
+                if response.status_code == 200:
+                    matches = response.json().get("matches", [])
+                    threats = sorted({match.get("threatType") for match in matches})
+
+                    logger.info(f"Safe Browsing matches for {ip}: {threats}")
+
+                    return {
+                        "score": 100 if matches else 0,
+                        "threats": threats
+                    }
+                else:
+                    logger.error(f"Safe Browsing API error: {response.status_code} - {response.text}")
+                    return {"score": 0, "error": f"HTTP {response.status_code}"}
+
+        except Exception as e:
+            logger.error(f"Safe Browsing check failed for {ip}: {e}")
+            return {"score": 0, "error": str(e)}
+
+
 class IPCheckerService:
     """Service for checking IP reputation using multiple providers"""
 
-    def __init__(self):
+    def __init__(self, rate_limiter: Optional[AsyncRateLimiter] = None):
         self.providers: List[IPCheckProvider] = []
+        # Optional cap on how often provider checks may start
+        self.rate_limiter = rate_limiter
         self._init_providers()
 
     def _init_providers(self):
@@ -112,15 +252,31 @@ class IPCheckerService:
         
         if settings.ABUSEIPDB_API_KEY:
             self.providers.append(
-                AbuseIPDBProvider(settings.ABUSEIPDB_API_KEY))
+                AbuseIPDBProvider(settings.ABUSEIPDB_API_KEY, settings.ABUSEIPDB_WEIGHT))
             logger.info("AbuseIPDB provider added")
         else:
             logger.warning("AbuseIPDB API key not found in settings")
 
+        if settings.OTX_API_KEY:
+            self.providers.append(
+                OTXProvider(settings.OTX_API_KEY, settings.OTX_WEIGHT))
+            logger.info("OTX provider added")
+
+        if settings.GOOGLE_SAFE_BROWSING_API_KEY:
+            self.providers.append(
+                SafeBrowsingProvider(settings.GOOGLE_SAFE_BROWSING_API_KEY,
+                                     settings.GOOGLE_SAFE_BROWSING_WEIGHT))
+            logger.info("Google Safe Browsing provider added")
+
         logger.info(f"Total providers initialized: {len(self.providers)}")
 
     async def check_ip_comprehensive(self, ip: str) -> SecurityScore:
-        """Perform comprehensive IP check using all providers"""
+        """Perform comprehensive IP check using all providers
+
+        Cheap and standard providers start first; expensive ones start once
+        those finish or AGGREGATION_EXPENSIVE_DELAY_MS elapses. As soon as
+        the completed results settle the verdict, pending calls are cancelled.
+        """
         if not self.providers:
             return SecurityScore(
                 ip=ip,
@@ -131,36 +287,82 @@ class IPCheckerService:
                 confidence=0.0
             )
 
-        # Run all providers concurrently
-        tasks = [provider.check_ip(ip) for provider in self.providers]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
+
+        loop = asyncio.get_running_loop()
+        eager = [p for p in self.providers if p.cost_class != ProviderCostClass.EXPENSIVE]
+        deferred = [p for p in self.providers if p.cost_class == ProviderCostClass.EXPENSIVE]
+        if not eager:
+            eager, deferred = deferred, []
+        deferred_at = loop.time() + settings.AGGREGATION_EXPENSIVE_DELAY_MS / 1000
+
+        pending: Dict[asyncio.Task, IPCheckProvider] = {
+            asyncio.create_task(provider.check_ip(ip)): provider for provider in eager
+        }
+        completed: Dict[str, Any] = {}
+        early_exit = False
+
+        try:
+            while pending or deferred:
+                if deferred and (not pending or loop.time() >= deferred_at):
+                    for provider in deferred:
+                        pending[asyncio.create_task(provider.check_ip(ip))] = provider
+                    deferred = []
+
+                timeout = max(deferred_at - loop.time(), 0) if deferred else None
+                done, _ = await asyncio.wait(
+                    pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    provider = pending.pop(task)
+                    result = None if task.exception() else task.result()
+                    if isinstance(result, dict) and not result.get("error"):
+                        completed[provider.provider_name] = (provider, result)
+
+                remaining_weight = sum(p.weight for p in list(pending.values()) + deferred)
+                if self._is_decisive(completed, remaining_weight):
+                    early_exit = True
+                    break
+        finally:
+            cancelled = [p.provider_name for p in list(pending.values()) + deferred]
+            for task in pending:
+                task.cancel()
 
         # Process results
-        total_score = 0
-        valid_results = 0
+        total_weight = sum(provider.weight for provider in self.providers)
+        done_weight = sum(provider.weight for provider, _ in completed.values())
+        weighted_score = sum(result.get("score", 0) * provider.weight
+                             for provider, result in completed.values())
         sources = []
         details = {}
+        contributions = {}
 
-        for i, result in enumerate(results):
-            if isinstance(result, dict) and not result.get("error"):
-                provider_name = self.providers[i].provider_name
-                score = result.get("score", 0)
-
-                total_score += score
-                valid_results += 1
-                sources.append(provider_name)
-                details[provider_name] = result
+        for name, (provider, result) in completed.items():
+            sources.append(name)
+            details[name] = result
+            contributions[name] = {
+                "score": result.get("score", 0),
+                "weight": provider.weight,
+                "cost_class": provider.cost_class.value,
+                "contribution": result.get("score", 0) * provider.weight / done_weight if done_weight else 0.0
+            }
 
         # Calculate final score and reputation
-        if valid_results > 0:
-            final_score = min(total_score // valid_results, 100)
-            confidence = min(valid_results / len(self.providers), 1.0)
+        if done_weight > 0:
+            final_score = min(int(round(weighted_score / done_weight)), 100)
+            confidence = min(done_weight / total_weight, 1.0)
         else:
             final_score = 0
             confidence = 0.0
 
         reputation = self._calculate_reputation(final_score)
 
+        details["contributions"] = contributions
+        details["early_exit"] = early_exit
+        if cancelled:
+            details["cancelled_providers"] = cancelled
+
         return SecurityScore(
             ip=ip,
             score=final_score,
@@ -171,6 +373,30 @@ class IPCheckerService:
             confidence=confidence
         )
 
+    def _is_decisive(self, completed: Dict[str, Any], remaining_weight: float) -> bool:
+        """Check whether outstanding providers can still change the verdict"""
+        if not settings.AGGREGATION_EARLY_EXIT or not completed or remaining_weight <= 0:
+            return False
+
+        done_weight = sum(provider.weight for provider, _ in completed.values())
+        weighted_score = sum(result.get("score", 0) * provider.weight
+                             for provider, result in completed.values())
+        if done_weight <= 0:
+            return False
+
+        # Outstanding providers could report anything from 0 to 100
+        all_weight = done_weight + remaining_weight
+        lowest = self._calculate_reputation(weighted_score / all_weight)
+        highest = self._calculate_reputation((weighted_score + 100 * remaining_weight) / all_weight)
+        if lowest == highest:
+            return True
+
+        # Otherwise exit only on a malicious verdict backed by enough weight; cheaper
+        # providers reporting nothing is not enough to call an IP safe without the rest
+        current = self._calculate_reputation(weighted_score / done_weight)
+        return (done_weight / all_weight >= settings.AGGREGATION_EARLY_EXIT_MIN_WEIGHT
+                and current == ReputationLevel.MALICIOUS)
+
     def _calculate_reputation(self, score: int) -> ReputationLevel:
         """Calculate reputation based on score with more realistic thresholds"""
         if score >= 75:  # Score muito alto = definitivamente malicioso
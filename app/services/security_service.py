@@ -1,7 +1,16 @@
 from app.services.ip_checker_service import IPCheckerService
+from app.services.verdict_filter_service import VerdictFilterService
+from app.services.geoip_service import GeoIPService
+from app.services.velocity_service import VelocityService
 from app.repositories.cache_repository import CacheRepository
-from app.models.security import SecurityScore, CallerInfo, RiskLevel
-from typing import Optional
+from app.models.security import SecurityScore, CallerInfo, RiskLevel, ReputationLevel
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.utils.ip_utils import canonicalize_ip
+from app.core.config import settings
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,30 +19,156 @@ logger = logging.getLogger(__name__)
 class SecurityService:
     """Main security service orchestrating IP and caller checks"""
 
-    def __init__(self, cache_repo: CacheRepository, ip_checker: IPCheckerService):
+    def __init__(self, cache_repo: CacheRepository, ip_checker: IPCheckerService,
+                 verdict_filters: Optional[VerdictFilterService] = None,
+                 admission: Optional[AdmissionController] = None,
+                 geoip: Optional[GeoIPService] = None,
+                 velocity: Optional[VelocityService] = None):
         self.cache_repo = cache_repo
         self.ip_checker = ip_checker
+        self.verdict_filters = verdict_filters
+        self.admission = admission
+        self.geoip = geoip
+        self.velocity = velocity
+
+    def _admit(self, lane: str):
+        """Admission context for a lane, or a no-op without admission control"""
+        return self.admission.admit(lane) if self.admission else nullcontext()
+
+    def _degraded_score(self, ip: str, lane: str) -> SecurityScore:
+        """Unknown verdict returned instead of queueing when a lane is saturated"""
+        return SecurityScore(
+            ip=ip,
+            score=0,
+            reputation=ReputationLevel.UNKNOWN,
+            sources=[],
+            last_updated=datetime.utcnow(),
+            details={"degraded": True, "shed_lane": lane},
+            confidence=0.0
+        )
+
+    def _enrich(self, score: SecurityScore) -> SecurityScore:
+        """Add local country/ASN data; applied on every answer, never cached"""
+        if self.geoip:
+            geo = self.geoip.lookup(score.ip)
+            if geo:
+                score.details["geo"] = geo
+        return score
+
+    def _count_velocity(self, kind: str, key: str) -> Dict[str, int]:
+        """Count a check towards the key's velocity windows"""
+        if not self.velocity:
+            return {}
+        return self.velocity.hit(kind, key)
+
+    def _apply_ip_velocity(self, score: SecurityScore, counts: Dict[str, int]) -> SecurityScore:
+        """Raise an IP to at least suspicious when its checks suddenly burst"""
+        if not counts:
+            return score
+
+        score.details["velocity"] = counts
+        if self.velocity.is_burst("ip", counts):
+            score.details["velocity_burst"] = round(self.velocity.burst_ratio("ip", counts), 1)
+            if score.reputation in (ReputationLevel.SAFE, ReputationLevel.UNKNOWN):
+                score.reputation = ReputationLevel.SUSPICIOUS
+                score.score = max(score.score, 25)
+        return score
 
     async def check_ip_security(self, ip: str, force_refresh: bool = False) -> SecurityScore:
         """Check IP security with caching"""
-        # Check cache first unless force refresh
-        if not force_refresh:
-            cached_score = await self.cache_repo.get_ip_score(ip)
-            if cached_score:
-                logger.info(f"Cache hit for IP {ip}")
-                return cached_score
+        ip = canonicalize_ip(ip)
+        counts = self._count_velocity("ip", ip)
+        score = await self._resolve_ip_score(ip, force_refresh)
+        return self._apply_ip_velocity(self._enrich(score), counts)
 
-        # Perform comprehensive check
-        logger.info(f"Performing comprehensive check for IP {ip}")
-        score = await self.ip_checker.check_ip_comprehensive(ip)
+    async def _resolve_ip_score(self, ip: str, force_refresh: bool) -> SecurityScore:
+        """Resolve a canonical IP through filters, cache and providers"""
+        try:
+            # Check local verdict filters, then cache, unless force refresh
+            if not force_refresh:
+                if self.verdict_filters:
+                    filtered_score = self.verdict_filters.lookup(ip)
+                    if filtered_score:
+                        return filtered_score
+
+                async with self._admit("hit"):
+                    cached_score = await self.cache_repo.get_ip_score(ip)
+                if cached_score:
+                    logger.info(f"Cache hit for IP {ip}")
+                    return cached_score
+
+            # Perform comprehensive check
+            logger.info(f"Performing comprehensive check for IP {ip}")
+            async with self._admit("miss"):
+                score = await self.ip_checker.check_ip_comprehensive(ip)
+        except AdmissionRejected as e:
+            if settings.ADMISSION_SHED_MODE == "degrade":
+                logger.warning(f"Degraded verdict for IP {ip}: {e}")
+                return self._degraded_score(ip, e.lane)
+            raise
 
         # Cache the result
-        await self.cache_repo.set_ip_score(score)
+        await self.cache_repo.set_ip_score(score, update_prefix=not force_refresh)
+        if self.verdict_filters:
+            await self.verdict_filters.record([score])
 
         return score
 
+    async def check_ips_bulk(self, ips: List[str], max_concurrency: Optional[int] = None,
+                             count_velocity: bool = False) -> Dict[str, SecurityScore]:
+        """Check many IPs with one bulk cache lookup and bounded provider concurrency
+
+        With count_velocity, every occurrence in ips counts as one check (live
+        traffic such as streamed call-setup events, not offline replays).
+        """
+        unique_ips = list(dict.fromkeys(canonicalize_ip(ip) for ip in ips))
+
+        ip_counts: Dict[str, Dict[str, int]] = {}
+        if count_velocity:
+            for ip in ips:
+                canonical_ip = canonicalize_ip(ip)
+                ip_counts[canonical_ip] = self._count_velocity("ip", canonical_ip)
+
+        results: Dict[str, SecurityScore] = {}
+        if self.verdict_filters:
+            for ip in unique_ips:
+                filtered_score = self.verdict_filters.lookup(ip)
+                if filtered_score:
+                    results[ip] = filtered_score
+
+        cached = await self.cache_repo.get_ip_scores(
+            [ip for ip in unique_ips if ip not in results])
+        results.update((ip, score) for ip, score in cached.items() if score)
+        misses = [ip for ip in unique_ips if ip not in results]
+        if misses:
+            logger.info(f"Bulk check: {len(results)} cache hits, {len(misses)} misses")
+
+            semaphore = asyncio.Semaphore(
+                max_concurrency or settings.PROVIDER_MAX_CONCURRENCY)
+
+            async def check_miss(ip: str) -> SecurityScore:
+                async with semaphore:
+                    return await self.ip_checker.check_ip_comprehensive(ip)
+
+            fresh_scores = await asyncio.gather(*(check_miss(ip) for ip in misses))
+            await self.cache_repo.set_ip_scores(fresh_scores)
+            if self.verdict_filters:
+                await self.verdict_filters.record(fresh_scores)
+            results.update(zip(misses, fresh_scores))
+
+        for ip, score in results.items():
+            self._apply_ip_velocity(self._enrich(score), ip_counts.get(ip))
+
+        return {ip: results[canonicalize_ip(ip)] for ip in ips}
+
     async def check_caller_info(self, phone_number: str, ip: Optional[str] = None) -> CallerInfo:
         """Check caller information"""
+        ip_score = await self.check_ip_security(ip) if ip else None
+        return self.assess_caller(phone_number, ip_score, count_velocity=True)
+
+    def assess_caller(self, phone_number: str, ip_score: Optional[SecurityScore] = None,
+                      count_velocity: bool = False) -> CallerInfo:
+        """Build caller information from an already resolved IP score"""
         # This is a placeholder implementation
         # In a real system, you'd query databases, telecom APIs, etc.
 
@@ -44,8 +179,8 @@ class SecurityService:
         )
 
         # If IP is provided, factor it into the risk assessment
-        if ip:
-            ip_score = await self.check_ip_security(ip)
+        if ip_score:
+            caller_info.location = ip_score.details.get("geo", {}).get("country")
             if ip_score.reputation.value == "malicious":
                 caller_info.risk_level = RiskLevel.HIGH
                 caller_info.reputation_score = 0.8
@@ -53,4 +188,24 @@ class SecurityService:
                 caller_info.risk_level = RiskLevel.MEDIUM
                 caller_info.reputation_score = 0.5
 
+        counts = self._count_velocity("caller", phone_number) if count_velocity else {}
+        if counts:
+            caller_info.velocity = counts
+            if self.velocity.is_burst("caller", counts):
+                # Bursts of checks for one number are a strong fraud signal
+                if caller_info.risk_level == RiskLevel.LOW:
+                    caller_info.risk_level = RiskLevel.MEDIUM
+                caller_info.reputation_score = max(caller_info.reputation_score, 0.5)
+
         return caller_info
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get runtime statistics"""
+        stats = {
+            "cache": self.cache_repo.get_stats()
+        }
+        if self.verdict_filters:
+            stats["verdict_filters"] = self.verdict_filters.get_stats()
+        if self.admission:
+            stats["admission"] = self.admission.get_stats()
+        return stats
@@ -0,0 +1,153 @@
+from app.core.config import settings
+from app.repositories.cache_repository import CacheRepository
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Optional, Tuple
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CounterKey = Tuple[str, str]
+
+
+def _window_label(seconds: int) -> str:
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+class VelocityService:
+    """Sliding-window check counts per IP and per caller
+
+    Each window is a Redis hash of time buckets (VELOCITY_BUCKETS_PER_WINDOW
+    per window). Increments are merged locally and flushed in one pipeline
+    every VELOCITY_FLUSH_INTERVAL_MS, and each flush re-reads the flushed
+    keys' buckets into a local snapshot. Counts are served from that
+    snapshot plus the increments not yet flushed, so checks never wait on
+    Redis; other workers' increments show up after at most one flush.
+    """
+
+    def __init__(self, cache_repo: CacheRepository):
+        self.cache_repo = cache_repo
+        self.windows: List[int] = settings.VELOCITY_WINDOWS
+        self.buckets = settings.VELOCITY_BUCKETS_PER_WINDOW
+        self.burst_minimums = {
+            "ip": settings.VELOCITY_IP_BURST_MIN,
+            "caller": settings.VELOCITY_CALLER_BURST_MIN
+        }
+        self._pending: DefaultDict[CounterKey, int] = defaultdict(int)
+        self._flushing: Dict[CounterKey, int] = {}
+        # Bucket counts per key and window, as of the key's last flush
+        self._snapshot: Dict[CounterKey, Tuple[float, List[Dict[int, int]]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _hash_key(self, kind: str, key: str, window: int) -> str:
+        return f"velocity:{kind}:{key}:{window}"
+
+    def hit(self, kind: str, key: str) -> Dict[str, int]:
+        """Count one check of a key and return its counts per window"""
+        self._pending[(kind, key)] += 1
+        return self.counts(kind, key)
+
+    def counts(self, kind: str, key: str) -> Dict[str, int]:
+        """Current counts of a key per window, from local state only"""
+        counter_key = (kind, key)
+        unflushed = self._pending.get(counter_key, 0) + self._flushing.get(counter_key, 0)
+        _, hashes = self._snapshot.get(counter_key, (0.0, [{} for _ in self.windows]))
+
+        now = time.time()
+        counts = {}
+        for window, buckets in zip(self.windows, hashes):
+            current = int(now // (window / self.buckets))
+            counts[_window_label(window)] = unflushed + sum(
+                count for bucket, count in buckets.items()
+                if current - self.buckets < bucket <= current)
+        return counts
+
+    def burst_ratio(self, kind: str, counts: Dict[str, int]) -> Optional[float]:
+        """How far the shortest window runs above the key's own rate over the longest one
+
+        Returns None unless the shortest window holds at least the kind's burst
+        minimum, so busy but steady keys (e.g. carrier NAT addresses) never
+        count as a burst.
+        """
+        short, long = min(self.windows), max(self.windows)
+        recent = counts.get(_window_label(short), 0)
+        if recent < self.burst_minimums[kind]:
+            return None
+
+        # Baseline: the long window without the recent one, scaled to the short window
+        earlier = max(counts.get(_window_label(long), 0) - recent, 0)
+        baseline = earlier * short / (long - short)
+        return recent / max(baseline, 1.0)
+
+    def is_burst(self, kind: str, counts: Dict[str, int]) -> bool:
+        """Whether a key suddenly gets VELOCITY_BURST_RATIO times its usual traffic"""
+        ratio = self.burst_ratio(kind, counts)
+        return ratio is not None and ratio >= settings.VELOCITY_BURST_RATIO
+
+    async def flush(self):
+        """Write merged local increments to Redis"""
+        if not self._pending:
+            return
+
+        self._flushing, self._pending = self._pending, defaultdict(int)
+        now = time.time()
+        increments = []
+        for (kind, key), count in self._flushing.items():
+            for window in self.windows:
+                bucket_size = window / self.buckets
+                bucket = int(now // bucket_size)
+                increments.append((
+                    self._hash_key(kind, key, window),
+                    bucket,
+                    count,
+                    bucket - self.buckets,
+                    int(window + bucket_size)
+                ))
+
+        try:
+            await self.cache_repo.apply_bucket_increments(increments)
+            await self._refresh_snapshot(list(self._flushing), now)
+        finally:
+            self._flushing = {}
+
+    async def _refresh_snapshot(self, counter_keys: List[CounterKey], now: float):
+        """Re-read the flushed keys' buckets and drop snapshots older than the longest window"""
+        hashes = await self.cache_repo.get_bucket_hashes([
+            self._hash_key(kind, key, window)
+            for kind, key in counter_keys
+            for window in self.windows
+        ])
+        for index, counter_key in enumerate(counter_keys):
+            start = index * len(self.windows)
+            self._snapshot[counter_key] = (now, hashes[start:start + len(self.windows)])
+
+        horizon = now - max(self.windows)
+        for counter_key in [k for k, (refreshed, _) in self._snapshot.items() if refreshed < horizon]:
+            del self._snapshot[counter_key]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.VELOCITY_FLUSH_INTERVAL_MS / 1000)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing velocity counters: {e}")
+
+    def start(self):
+        """Start the background flush loop"""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and flush what is left"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
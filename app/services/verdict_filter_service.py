@@ -0,0 +1,209 @@
+from app.core.config import settings
+from app.models.security import SecurityScore, ReputationLevel
+from app.repositories.cache_repository import CacheRepository
+from app.utils.bloom import BloomFilter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+FILTER_KINDS = ("safe", "malicious")
+
+
+class VerdictFilterService:
+    """In-memory Bloom filters of known-safe and known-malicious IPs
+
+    Fresh provider verdicts are queued in Redis. One worker at a time folds
+    the queue into the current filters and publishes the added IPs as a new
+    version; full filters are published only when a generation starts.
+    Every worker polls the version and applies new deltas, so clear cases
+    are answered without a network hop.
+    Filters are started afresh once full or older than BLOOM_MAX_AGE_SECONDS
+    (capped at CACHE_TTL), so a filter verdict never outlives the cached
+    verdict it came from. Local filters past that age are not consulted even
+    if no newer generation has been published yet.
+    """
+
+    def __init__(self, cache_repo: CacheRepository):
+        self.cache_repo = cache_repo
+        self.version = 0
+        self.base_version = 0
+        self.filters: Dict[str, BloomFilter] = {kind: self._new_filter() for kind in FILTER_KINDS}
+        self.stats: Dict[str, int] = {"safe_hits": 0, "malicious_hits": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    def _new_filter(self) -> BloomFilter:
+        return BloomFilter(settings.BLOOM_CAPACITY, settings.BLOOM_ERROR_RATE)
+
+    @property
+    def max_age(self) -> int:
+        """Generation lifetime; never longer than the cache TTL of the source verdicts"""
+        return min(settings.BLOOM_MAX_AGE_SECONDS, settings.CACHE_TTL)
+
+    def _is_stale(self, bloom: BloomFilter) -> bool:
+        return time.time() - bloom.created_at > self.max_age
+
+    def lookup(self, ip: str) -> Optional[SecurityScore]:
+        """Answer a clear-cut IP from the filters, or None to fall through"""
+        safe, malicious = self.filters["safe"], self.filters["malicious"]
+        in_safe = not self._is_stale(safe) and ip in safe
+        in_malicious = not self._is_stale(malicious) and ip in malicious
+        if in_safe == in_malicious:
+            return None
+
+        kind = "malicious" if in_malicious else "safe"
+        self.stats[f"{kind}_hits"] += 1
+        return SecurityScore(
+            ip=ip,
+            score=75 if in_malicious else 0,
+            reputation=ReputationLevel.MALICIOUS if in_malicious else ReputationLevel.SAFE,
+            sources=["verdict_filter"],
+            last_updated=datetime.utcnow(),
+            details={"verdict_filter": kind, "filter_version": self.version},
+            # Only the membership is stored, so report the weakest source verdict the filter admits
+            confidence=settings.BLOOM_MIN_CONFIDENCE
+        )
+
+    def _classify(self, score: SecurityScore) -> Optional[str]:
+        """Get the filter a verdict belongs in, if it is clear enough"""
+        if score.confidence < settings.BLOOM_MIN_CONFIDENCE:
+            return None
+        if score.reputation == ReputationLevel.MALICIOUS:
+            return "malicious"
+        if score.reputation == ReputationLevel.SAFE and score.score == 0:
+            return "safe"
+        return None
+
+    async def record(self, scores: List[SecurityScore]):
+        """Queue clear provider verdicts for the next filter rebuild"""
+        candidates: Dict[str, List[str]] = {kind: [] for kind in FILTER_KINDS}
+        for score in scores:
+            kind = self._classify(score)
+            if kind:
+                candidates[kind].append(score.ip)
+
+        for kind, ips in candidates.items():
+            if ips:
+                await self.cache_repo.add_filter_candidates(kind, ips)
+
+    def warm(self, scores: List[Tuple[SecurityScore, int]]):
+        """Add clear (verdict, remaining TTL in ms) pairs to the local filters only
+
+        Used for warm-start snapshots. A verdict is skipped when its cache entry
+        expires before the filter generation does, so it cannot outlive it.
+        """
+        now = time.time()
+        for score, ttl_ms in scores:
+            kind = self._classify(score)
+            if not kind:
+                continue
+            bloom = self.filters[kind]
+            if now + ttl_ms / 1000 >= bloom.created_at + self.max_age:
+                bloom.add(score.ip)
+
+    async def refresh(self):
+        """Catch up with the published filters: load a new generation, then apply deltas"""
+        version, base = await self.cache_repo.get_filter_versions()
+        if version <= self.version and base == self.base_version:
+            return
+
+        if base and base != self.base_version:
+            filters = {}
+            for kind in FILTER_KINDS:
+                data = await self.cache_repo.get_filter_snapshot(kind, base)
+                if data is None:
+                    logger.warning(f"Verdict filter snapshot {kind}:{base} missing")
+                    return
+                filters[kind] = await asyncio.to_thread(BloomFilter.from_bytes, data)
+
+            self.filters = filters
+            self.version = self.base_version = base
+            logger.info(f"Loaded verdict filters generation {base}")
+
+        if version > self.version:
+            versions = list(range(self.version + 1, version + 1))
+            deltas = await self.cache_repo.get_filter_deltas(versions)
+            missing = [v for v, delta in zip(versions, deltas) if delta is None]
+            if missing:
+                logger.warning(f"Verdict filter deltas {missing} missing, skipping them")
+            await asyncio.to_thread(self._apply_deltas, [delta for delta in deltas if delta])
+            self.version = version
+
+    def _apply_deltas(self, deltas: List[Dict[str, List[str]]]):
+        for delta in deltas:
+            for kind, ips in delta.items():
+                bloom = self.filters[kind]
+                for ip in ips:
+                    bloom.add(ip)
+
+    async def rebuild(self) -> bool:
+        """Fold queued verdicts into the filters and publish them as a delta or a new generation
+
+        Only the IPs added since the previous version are published, so workers
+        download the full filters once per generation rather than every version.
+        """
+        if not await self.cache_repo.acquire_lock("verdict_filter_rebuild", settings.BLOOM_REFRESH_SECONDS):
+            return False
+
+        await self.refresh()
+        latest, base = await self.cache_repo.get_filter_versions()
+
+        delta = {kind: await self.cache_repo.drain_filter_candidates(kind) for kind in FILTER_KINDS}
+        added = sum(len(ips) for ips in delta.values())
+        # A missing or unloadable generation (e.g. after a Redis flush) is replaced too
+        rotate = not base or base != self.base_version or any(
+            bloom.is_full or self._is_stale(bloom) for bloom in self.filters.values())
+        if not added and not rotate:
+            return False
+
+        version = max(latest, self.version) + 1
+        if rotate:
+            logger.info("Starting a new verdict filter generation")
+            self.filters = {kind: self._new_filter() for kind in FILTER_KINDS}
+            await asyncio.to_thread(self._apply_deltas, [delta])
+            snapshots = await asyncio.to_thread(
+                lambda: {kind: bloom.to_bytes() for kind, bloom in self.filters.items()})
+            published = await self.cache_repo.publish_filter_snapshots(version, snapshots, self.max_age)
+            # On failure, reload the published generation on the next refresh
+            self.base_version = version if published else 0
+        else:
+            await asyncio.to_thread(self._apply_deltas, [delta])
+            published = await self.cache_repo.publish_filter_delta(version, delta, self.max_age)
+
+        if published:
+            self.version = version
+            logger.info(f"Published verdict filters version {version} (+{added} IPs)")
+        return published
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rebuild()
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing verdict filters: {e}")
+            await asyncio.sleep(settings.BLOOM_REFRESH_SECONDS)
+
+    def start(self):
+        """Start the background rebuild/refresh loop"""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            **self.stats,
+            "version": self.version,
+            "generation": self.base_version,
+            "safe_entries": self.filters["safe"].count,
+            "malicious_entries": self.filters["malicious"].count
+        }
@@ -0,0 +1,55 @@
+import hashlib
+import math
+import struct
+import time
+from typing import Optional
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized from a capacity and a false-positive rate"""
+
+    # capacity, error_rate, count, created_at, bit count, hash count
+    _HEADER = struct.Struct("!QdQdQI")
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None,
+                 count: int = 0, created_at: Optional[float] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+        self.created_at = created_at or time.time()
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def to_bytes(self) -> bytes:
+        header = self._HEADER.pack(self.capacity, self.error_rate, self.count,
+                                   self.created_at, self.num_bits, self.num_hashes)
+        return header + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        capacity, error_rate, count, created_at, num_bits, num_hashes = \
+            cls._HEADER.unpack_from(data)
+        bloom = cls(capacity, error_rate, bytearray(data[cls._HEADER.size:]), count, created_at)
+        if (bloom.num_bits, bloom.num_hashes) != (num_bits, num_hashes):
+            raise ValueError("Bloom filter snapshot does not match its parameters")
+        return bloom
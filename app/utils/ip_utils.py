@@ -0,0 +1,28 @@
+import ipaddress
+from typing import Optional
+
+
+def canonicalize_ip(ip: str) -> str:
+    """Return the canonical text form of an IP address
+
+    IPv6 addresses are compressed and lower-cased, and IPv4-mapped IPv6
+    addresses (``::ffff:a.b.c.d``) fold onto their IPv4 form.
+    """
+    address = ipaddress.ip_address(str(ip).strip())
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return str(address)
+
+
+def ipv6_prefix(ip: str, prefix_length: int) -> Optional[str]:
+    """Return the IPv6 network containing ``ip`` (e.g. ``2001:db8::/64``)
+
+    Returns None for IPv4 addresses or when prefix keying is disabled.
+    """
+    if not prefix_length:
+        return None
+    address = ipaddress.ip_address(canonicalize_ip(ip))
+    if address.version != 6:
+        return None
+    network = ipaddress.IPv6Network(f"{address}/{prefix_length}", strict=False)
+    return str(network)
@@ -0,0 +1,155 @@
+import ipaddress
+import mmap
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+METADATA_MARKER = b"\xab\xcd\xefMaxMind.com"
+# Data section is preceded by 16 zero bytes
+DATA_SECTION_SEPARATOR = 16
+
+
+class InvalidDatabaseError(Exception):
+    """Raised when a file is not a readable MaxMind DB"""
+
+
+class MMDBReader:
+    """Minimal reader for MaxMind DB (.mmdb) files backed by a read-only mmap
+
+    The file is mapped, not loaded, so every process reading the same file
+    shares the OS page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        marker = self._buffer.rfind(METADATA_MARKER, max(0, len(self._buffer) - 128 * 1024))
+        if marker < 0:
+            self._buffer.close()
+            raise InvalidDatabaseError(f"{path} is not a MaxMind DB file")
+
+        metadata_start = marker + len(METADATA_MARKER)
+        self.metadata: Dict[str, Any] = self._decode(metadata_start, metadata_start)[0]
+        self.node_count: int = self.metadata["node_count"]
+        self.record_size: int = self.metadata["record_size"]
+        self.ip_version: int = self.metadata["ip_version"]
+        if self.record_size not in (24, 28, 32):
+            raise InvalidDatabaseError(f"Unsupported record size {self.record_size}")
+
+        self._node_bytes = self.record_size * 2 // 8
+        self._search_tree_size = self.node_count * self._node_bytes
+        self._data_start = self._search_tree_size + DATA_SECTION_SEPARATOR
+        self._ipv4_start = self._find_ipv4_start()
+
+    def close(self):
+        self._buffer.close()
+
+    def _find_ipv4_start(self) -> int:
+        """Node reached after the 96 leading zero bits of an IPv4-in-IPv6 address"""
+        if self.ip_version != 6:
+            return 0
+        node = 0
+        for _ in range(96):
+            if node >= self.node_count:
+                break
+            node = self._read_record(node, 0)
+        return node
+
+    def _read_record(self, node: int, bit: int) -> int:
+        offset = node * self._node_bytes
+        buffer = self._buffer
+        if self.record_size == 24:
+            offset += bit * 3
+            return int.from_bytes(buffer[offset:offset + 3], "big")
+        if self.record_size == 28:
+            middle = buffer[offset + 3]
+            if bit:
+                return ((middle & 0x0F) << 24) | int.from_bytes(buffer[offset + 4:offset + 7], "big")
+            return ((middle & 0xF0) << 20) | int.from_bytes(buffer[offset:offset + 3], "big")
+        offset += bit * 4
+        return int.from_bytes(buffer[offset:offset + 4], "big")
+
+    def get(self, ip: str) -> Optional[Any]:
+        """Look up the record for an IP, or None if it is not in the database"""
+        address = ipaddress.ip_address(ip)
+        if address.version == 6 and self.ip_version == 4:
+            return None
+
+        if address.version == 4 and self.ip_version == 6:
+            node = self._ipv4_start
+        else:
+            node = 0
+        bits = address.max_prefixlen
+        packed = int(address)
+
+        for depth in range(bits):
+            if node >= self.node_count:
+                break
+            node = self._read_record(node, (packed >> (bits - 1 - depth)) & 1)
+
+        if node <= self.node_count:
+            return None
+
+        offset = self._data_start + node - self.node_count - DATA_SECTION_SEPARATOR
+        return self._decode(offset, self._data_start)[0]
+
+    def _decode(self, offset: int, base: int) -> Tuple[Any, int]:
+        """Decode one data field at offset; pointers are relative to base"""
+        buffer = self._buffer
+        ctrl = buffer[offset]
+        offset += 1
+        type_num = ctrl >> 5
+
+        if type_num == 1:
+            pointer_size = (ctrl >> 3) & 0x3
+            if pointer_size == 0:
+                pointer = ((ctrl & 0x7) << 8) | buffer[offset]
+            elif pointer_size == 1:
+                pointer = (((ctrl & 0x7) << 16) | int.from_bytes(buffer[offset:offset + 2], "big")) + 2048
+            elif pointer_size == 2:
+                pointer = (((ctrl & 0x7) << 24) | int.from_bytes(buffer[offset:offset + 3], "big")) + 526336
+            else:
+                pointer = int.from_bytes(buffer[offset:offset + 4], "big")
+            value, _ = self._decode(base + pointer, base)
+            return value, offset + pointer_size + 1
+
+        if type_num == 0:
+            type_num = 7 + buffer[offset]
+            offset += 1
+
+        size = ctrl & 0x1F
+        if size >= 29:
+            extra = size - 28
+            size_bytes = int.from_bytes(buffer[offset:offset + extra], "big")
+            offset += extra
+            size = (29, 285, 65821)[extra - 1] + size_bytes
+
+        if type_num == 2:
+            return buffer[offset:offset + size].decode("utf-8"), offset + size
+        if type_num == 3:
+            return struct.unpack(">d", buffer[offset:offset + 8])[0], offset + 8
+        if type_num == 4:
+            return bytes(buffer[offset:offset + size]), offset + size
+        if type_num in (5, 6, 9, 10):
+            return int.from_bytes(buffer[offset:offset + size], "big"), offset + size
+        if type_num == 7:
+            result = {}
+            for _ in range(size):
+                key, offset = self._decode(offset, base)
+                result[key], offset = self._decode(offset, base)
+            return result, offset
+        if type_num == 8:
+            return int.from_bytes(buffer[offset:offset + size], "big", signed=size == 4), offset + size
+        if type_num == 11:
+            items = []
+            for _ in range(size):
+                item, offset = self._decode(offset, base)
+                items.append(item)
+            return items, offset
+        if type_num == 14:
+            return bool(size), offset
+        if type_num == 15:
+            return struct.unpack(">f", buffer[offset:offset + 4])[0], offset + 4
+
+        raise InvalidDatabaseError(f"Unsupported data type {type_num} at offset {offset}")
@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import json
+import logging
+import signal
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from kafka import KafkaConsumer, KafkaProducer
+
+from app.core.config import settings
+from app.dependencies import (
+    get_security_service, get_cache_repository, get_verdict_filter_service, get_velocity_service
+)
+from app.services.security_service import SecurityService
+from app.utils.ip_utils import canonicalize_ip
+
+logger = logging.getLogger(__name__)
+
+
+class ScoringWorker:
+    """Consume call-setup events from Kafka, score them and publish verdicts
+
+    The consumer and producer are injected, so any object exposing the
+    kafka-python ``poll``/``commit``/``seek`` and ``send``/``flush`` methods
+    (for example a local stand-in broker) can drive the worker.
+    Offsets are committed only after the batch's verdicts have been flushed,
+    giving at-least-once delivery. A batch that fails KAFKA_WORKER_MAX_RETRIES
+    times is replayed record by record, and records that still fail go to the
+    dead-letter topic, so one poison record cannot stall the partition.
+    """
+
+    def __init__(
+        self,
+        security_service: SecurityService,
+        consumer: Any,
+        producer: Any,
+        output_topic: str = None,
+        batch_size: int = None,
+        poll_timeout_ms: int = None,
+        dead_letter_topic: str = None,
+        max_retries: int = None
+    ):
+        self.security_service = security_service
+        self.consumer = consumer
+        self.producer = producer
+        self.output_topic = output_topic or settings.KAFKA_WORKER_OUTPUT_TOPIC
+        self.batch_size = batch_size or settings.KAFKA_WORKER_BATCH_SIZE
+        self.poll_timeout_ms = poll_timeout_ms or settings.KAFKA_WORKER_POLL_TIMEOUT_MS
+        self.dead_letter_topic = dead_letter_topic or settings.KAFKA_WORKER_DEAD_LETTER_TOPIC
+        self.max_retries = max_retries or settings.KAFKA_WORKER_MAX_RETRIES
+        self._failures = 0
+        self._running = False
+
+    def stop(self):
+        """Ask the worker to stop after the current batch"""
+        self._running = False
+
+    async def run(self):
+        """Process batches until stopped"""
+        self._running = True
+        logger.info(f"Scoring worker started, publishing to {self.output_topic}")
+
+        while self._running:
+            try:
+                await self.process_batch()
+            except Exception as e:
+                self._failures += 1
+                logger.error(f"Error processing batch (attempt {self._failures}), retrying: {e}")
+                await asyncio.sleep(1)
+
+        logger.info("Scoring worker stopped")
+
+    async def process_batch(self) -> int:
+        """Poll one micro-batch, score it, publish verdicts and commit offsets"""
+        polled = await asyncio.to_thread(
+            self.consumer.poll,
+            timeout_ms=self.poll_timeout_ms,
+            max_records=self.batch_size
+        )
+        if not polled:
+            return 0
+
+        records = [record for batch in polled.values() for record in batch]
+        try:
+            if self._failures >= self.max_retries:
+                await self._process_one_by_one(records)
+            else:
+                await self._publish_verdicts(records)
+        except Exception:
+            # Rewind so the batch is redelivered instead of silently skipped
+            for partition, batch in polled.items():
+                self.consumer.seek(partition, batch[0].offset)
+            raise
+
+        await asyncio.to_thread(self.consumer.commit)
+        self._failures = 0
+        logger.info(f"Scored and committed {len(records)} events")
+        return len(records)
+
+    async def _publish_verdicts(self, records: List[Any]):
+        """Score records with one bulk lookup and publish their verdicts"""
+        events = [self._parse_event(record.value) for record in records]
+
+        ips = [event["ip"] for event in events if event.get("ip")]
+        scores = await self.security_service.check_ips_bulk(ips, count_velocity=True) if ips else {}
+
+        await self._produce([
+            (self.output_topic, record.key, self._build_verdict(event, scores))
+            for record, event in zip(records, events)
+        ])
+
+    async def _produce(self, messages: List[Tuple[str, Any, Any]]):
+        """Send (topic, key, value) messages and wait until each one is acknowledged"""
+        futures = [self.producer.send(topic, key=key, value=value) for topic, key, value in messages]
+        await asyncio.to_thread(self._wait_for_delivery, futures)
+
+    def _wait_for_delivery(self, futures: List[Any]):
+        # flush() does not raise for failed records; their futures do
+        self.producer.flush()
+        for future in futures:
+            if future is not None:
+                future.get()
+
+    async def _process_one_by_one(self, records: List[Any]):
+        """Isolate failing records of a batch that keeps failing"""
+        logger.warning(f"Batch failed {self._failures} times, processing {len(records)} records one by one")
+        for record in records:
+            try:
+                await self._publish_verdicts([record])
+            except Exception as e:
+                await self._dead_letter(record, e)
+
+    async def _dead_letter(self, record: Any, error: Exception):
+        """Publish a failed record to the dead-letter topic so its offset can be committed
+
+        Raises when the dead-letter topic cannot be written either, so the
+        batch is rewound instead of committed without any trace of the record.
+        """
+        location = f"{record.topic}:{record.partition}:{record.offset}"
+        logger.error(f"Dead-lettering record {location}: {error}")
+
+        value = record.value
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", errors="replace")
+        dead_letter = {
+            "topic": record.topic,
+            "partition": record.partition,
+            "offset": record.offset,
+            "error": str(error),
+            "failed_at": datetime.utcnow().isoformat()
+        }
+
+        # Retry without the payload in case the record itself is what fails (e.g. too large)
+        try:
+            await self._produce([(self.dead_letter_topic, record.key, {**dead_letter, "value": value})])
+        except Exception as e:
+            logger.error(f"Error publishing record {location} to {self.dead_letter_topic}: {e}")
+            await self._produce([(self.dead_letter_topic, record.key, dead_letter)])
+
+    def _parse_event(self, raw: Any) -> Dict[str, Any]:
+        """Decode and validate a call-setup event"""
+        try:
+            event = json.loads(raw) if isinstance(raw, (bytes, str)) else dict(raw)
+            if not isinstance(event, dict):
+                return {"error": "Event must be a JSON object"}
+            if event.get("ip"):
+                event["ip"] = canonicalize_ip(event["ip"])
+            return event
+        except (ValueError, TypeError) as e:
+            return {"error": f"Invalid event: {e}"}
+
+    def _build_verdict(self, event: Dict[str, Any], scores: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the enriched verdict published for one event"""
+        verdict: Dict[str, Any] = {
+            "call_id": event.get("call_id"),
+            "processed_at": datetime.utcnow().isoformat()
+        }
+
+        if event.get("error"):
+            verdict["error"] = event["error"]
+            return verdict
+
+        ip_score = scores.get(event["ip"]) if event.get("ip") else None
+        if ip_score:
+            verdict["ip_score"] = ip_score.model_dump(mode="json")
+
+        if event.get("phone_number"):
+            caller_info = self.security_service.assess_caller(
+                event["phone_number"], ip_score, count_velocity=True)
+            verdict["caller"] = caller_info.model_dump(mode="json")
+
+        return verdict
+
+
+def build_consumer(input_topic: str, group_id: str, bootstrap_servers: List[str], batch_size: int):
+    """Create a Kafka consumer that leaves offset commits to the worker"""
+    return KafkaConsumer(
+        input_topic,
+        bootstrap_servers=bootstrap_servers,
+        group_id=group_id,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        max_poll_records=batch_size
+    )
+
+
+def build_producer(bootstrap_servers: List[str]):
+    """Create a Kafka producer for verdicts"""
+    return KafkaProducer(
+        bootstrap_servers=bootstrap_servers,
+        value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+        acks="all",
+        linger_ms=5
+    )
+
+
+async def run_worker(args: argparse.Namespace):
+    """Wire up the worker and run it until SIGINT/SIGTERM"""
+    bootstrap_servers = args.bootstrap_servers.split(",")
+    consumer = build_consumer(
+        args.input_topic, args.group_id, bootstrap_servers, args.batch_size)
+    producer = build_producer(bootstrap_servers)
+
+    worker = ScoringWorker(
+        await get_security_service(),
+        consumer,
+        producer,
+        output_topic=args.output_topic,
+        batch_size=args.batch_size,
+        dead_letter_topic=args.dead_letter_topic
+    )
+
+    verdict_filters = await get_verdict_filter_service()
+    if verdict_filters:
+        await verdict_filters.refresh()
+        verdict_filters.start()
+
+    velocity = await get_velocity_service()
+    if velocity:
+        velocity.start()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        if velocity:
+            await velocity.stop()
+        if verdict_filters:
+            await verdict_filters.stop()
+        consumer.close()
+        producer.close()
+        cache_repo = await get_cache_repository()
+        await cache_repo.disconnect()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="CallerWatch Kafka scoring worker")
+    parser.add_argument("--bootstrap-servers", default=settings.KAFKA_BOOTSTRAP_SERVERS)
+    parser.add_argument("--input-topic", default=settings.KAFKA_WORKER_INPUT_TOPIC)
+    parser.add_argument("--output-topic", default=settings.KAFKA_WORKER_OUTPUT_TOPIC)
+    parser.add_argument("--dead-letter-topic", default=settings.KAFKA_WORKER_DEAD_LETTER_TOPIC)
+    parser.add_argument("--group-id", default=settings.KAFKA_WORKER_GROUP_ID)
+    parser.add_argument("--batch-size", type=int, default=settings.KAFKA_WORKER_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    asyncio.run(run_worker(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,15 @@ import logging
 
 from app.core.config import settings
 from app.core.kafka_logger import setup_kafka_logging  # 🆕 Novo import
-from app.routers import auth, security
-from app.dependencies import get_cache_repository
+from app.core.profiling import loop_lag_monitor
+from app.middleware.profiling import ProfilingMiddleware
+from app.routers import auth, security, admin
+from app.dependencies import (
+    get_cache_repository,
+    get_verdict_filter_service,
+    get_cache_snapshot_service,
+    get_velocity_service
+)
 
 # Configure logging
 logging.basicConfig(
@@ -28,9 +35,38 @@ async def lifespan(app: FastAPI):
     cache_repo = await get_cache_repository()
     logger.info("Cache repository initialized")
 
+    verdict_filters = await get_verdict_filter_service()
+    if verdict_filters:
+        await verdict_filters.refresh()
+
+    # Warm the cache before the app starts accepting requests
+    cache_snapshots = await get_cache_snapshot_service()
+    if cache_snapshots:
+        await cache_snapshots.load()
+        cache_snapshots.start()
+
+    if verdict_filters:
+        verdict_filters.start()
+        logger.info("Verdict filters loaded")
+
+    velocity = await get_velocity_service()
+    if velocity:
+        velocity.start()
+
+    if settings.LOOP_LAG_MONITOR_ENABLED:
+        loop_lag_monitor.start()
+
     yield
 
     # Shutdown
+    if velocity:
+        await velocity.stop()
+    if cache_snapshots:
+        await cache_snapshots.stop()
+    if verdict_filters:
+        await verdict_filters.stop()
+    if settings.LOOP_LAG_MONITOR_ENABLED:
+        await loop_lag_monitor.stop()
     if kafka_handler and kafka_handler.producer:
         kafka_handler.producer.close()
     logger.info("CallerWatch API shutdown complete")
@@ -51,10 +87,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(security.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
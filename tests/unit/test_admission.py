@@ -0,0 +1,63 @@
+from app.core.admission import AdaptiveLimiter
+from app.core.config import settings
+
+
+def make_limiter(initial_limit: int = 200) -> AdaptiveLimiter:
+    return AdaptiveLimiter("hit", initial_limit, 1000, queue_timeout_ms=50, target_latency_ms=20)
+
+
+def run_load(limiter: AdaptiveLimiter, concurrency: int, latency: float, rounds: int):
+    """Complete rounds of `concurrency` simultaneous requests taking `latency` seconds each"""
+    for _ in range(rounds):
+        limiter.in_flight += concurrency
+        for _ in range(concurrency):
+            limiter.release(latency)
+
+
+def test_single_slow_request_does_not_shrink_limit():
+    limiter = make_limiter()
+    run_load(limiter, 60, 0.002, 10)
+    limit = limiter.limit
+
+    run_load(limiter, 1, 0.5, 1)
+
+    assert limiter.limit == limit
+
+
+def test_latency_within_tolerance_of_baseline_keeps_limit():
+    limiter = make_limiter()
+
+    # Slightly above the 20 ms target, but that is what this lane costs unloaded
+    run_load(limiter, 60, 0.025, 100)
+
+    assert limiter.limit == 200
+
+
+def test_overload_shrinks_at_most_once_per_window():
+    limiter = make_limiter()
+    run_load(limiter, 150, 0.002, 10)
+    limit = limiter.limit
+
+    # Two windows' worth of slow completions close at most two windows
+    run_load(limiter, int(limit), 0.2, 2)
+
+    assert limit * 0.9 ** 2 <= limiter.limit < limit
+
+
+def test_sustained_overload_shrinks_limit_and_recovers():
+    limiter = make_limiter()
+    run_load(limiter, 150, 0.002, 10)
+
+    run_load(limiter, 150, 0.2, 200)
+    assert settings.ADMISSION_MIN_LIMIT <= limiter.limit <= 5
+
+    run_load(limiter, 150, 0.002, 100)
+    assert limiter.limit > 100
+
+
+def test_underused_lane_does_not_grow():
+    limiter = make_limiter()
+
+    run_load(limiter, 10, 0.001, 200)
+
+    assert limiter.limit == 200
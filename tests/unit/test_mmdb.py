@@ -0,0 +1,242 @@
+import ipaddress
+import os
+import struct
+
+import pytest
+
+from app.services.geoip_service import GeoIPDatabase, GeoIPService
+from app.utils.mmdb import DATA_SECTION_SEPARATOR, METADATA_MARKER, MMDBReader
+
+
+def _control(type_num: int, size: int) -> bytes:
+    """Control byte(s) for a field; extended types (> 7) use a second type byte"""
+    if size < 29:
+        size_bits, extra = size, b""
+    elif size < 285:
+        size_bits, extra = 29, bytes([size - 29])
+    elif size < 65821:
+        size_bits, extra = 30, (size - 285).to_bytes(2, "big")
+    else:
+        size_bits, extra = 31, (size - 65821).to_bytes(3, "big")
+
+    if type_num <= 7:
+        return bytes([(type_num << 5) | size_bits]) + extra
+    return bytes([size_bits, type_num - 7]) + extra
+
+
+def encode(value) -> bytes:
+    if isinstance(value, Pointer):
+        return value.encode()
+    if isinstance(value, bool):
+        return _control(14, int(value))
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return _control(2, len(data)) + data
+    if isinstance(value, bytes):
+        return _control(4, len(value)) + value
+    if isinstance(value, float):
+        return _control(3, 8) + struct.pack(">d", value)
+    if isinstance(value, int):
+        data = value.to_bytes((value.bit_length() + 7) // 8, "big")
+        return _control(6 if value < 2 ** 32 else 9, len(data)) + data
+    if isinstance(value, dict):
+        return _control(7, len(value)) + b"".join(
+            encode(key) + encode(item) for key, item in value.items())
+    if isinstance(value, list):
+        return _control(11, len(value)) + b"".join(encode(item) for item in value)
+    raise TypeError(value)
+
+
+class Pointer:
+    """A pointer to an offset in the data section, in the smallest size class that fits"""
+
+    def __init__(self, offset: int):
+        self.offset = offset
+
+    def encode(self) -> bytes:
+        offset = self.offset
+        if offset < 2048:
+            return bytes([0x20 | (offset >> 8), offset & 0xFF])
+        if offset < 526336:
+            value = offset - 2048
+            return bytes([0x28 | (value >> 16)]) + (value & 0xFFFF).to_bytes(2, "big")
+        if offset < 134744064:
+            value = offset - 526336
+            return bytes([0x30 | (value >> 24)]) + (value & 0xFFFFFF).to_bytes(3, "big")
+        return bytes([0x38]) + offset.to_bytes(4, "big")
+
+
+class MMDBWriter:
+    """Just enough of the MaxMind DB format to build test fixtures"""
+
+    def __init__(self, ip_version: int = 6, record_size: int = 28):
+        self.ip_version = ip_version
+        self.record_size = record_size
+        self.nodes = [[None, None]]
+        self.data = bytearray()
+
+    def add_data(self, value) -> int:
+        """Append a value to the data section and return its offset"""
+        offset = len(self.data)
+        self.data += encode(value)
+        return offset
+
+    def insert(self, network: str, value):
+        self.insert_offset(network, self.add_data(value))
+
+    def insert_offset(self, network: str, offset: int):
+        net = ipaddress.ip_network(network)
+        bits = int(net.network_address)
+        depth = net.prefixlen
+        if self.ip_version == 6 and net.version == 4:
+            # IPv4 lives in the IPv4-compatible ::a.b.c.d/96 subtree
+            depth += 96
+        total_bits = 128 if self.ip_version == 6 else 32
+
+        node = 0
+        for index in range(depth):
+            bit = (bits >> (total_bits - 1 - index)) & 1
+            if index == depth - 1:
+                self.nodes[node][bit] = ("data", offset)
+            else:
+                if not isinstance(self.nodes[node][bit], int):
+                    self.nodes.append([None, None])
+                    self.nodes[node][bit] = len(self.nodes) - 1
+                node = self.nodes[node][bit]
+
+    def _record(self, value) -> int:
+        node_count = len(self.nodes)
+        if value is None:
+            return node_count
+        if isinstance(value, int):
+            return value
+        return node_count + DATA_SECTION_SEPARATOR + value[1]
+
+    def _node(self, left: int, right: int) -> bytes:
+        if self.record_size == 24:
+            return left.to_bytes(3, "big") + right.to_bytes(3, "big")
+        if self.record_size == 28:
+            middle = ((left >> 24) << 4) | (right >> 24)
+            return (left & 0xFFFFFF).to_bytes(3, "big") + bytes([middle]) + (right & 0xFFFFFF).to_bytes(3, "big")
+        return left.to_bytes(4, "big") + right.to_bytes(4, "big")
+
+    def write(self, path, database_type: str = "Test"):
+        tree = b"".join(self._node(self._record(left), self._record(right)) for left, right in self.nodes)
+        metadata = encode({
+            "node_count": len(self.nodes),
+            "record_size": self.record_size,
+            "ip_version": self.ip_version,
+            "database_type": database_type,
+            "binary_format_major_version": 2,
+            "binary_format_minor_version": 0,
+            "languages": ["en"],
+            "description": {"en": "Test database"},
+            "build_epoch": 1700000000
+        })
+        with open(path, "wb") as handle:
+            handle.write(tree + b"\0" * DATA_SECTION_SEPARATOR + bytes(self.data) + METADATA_MARKER + metadata)
+
+
+def country_db(path, iso_code: str = "US", record_size: int = 28):
+    writer = MMDBWriter(record_size=record_size)
+    writer.insert("8.8.8.0/24", {"country": {"iso_code": iso_code}})
+    writer.insert("1.0.0.0/8", {"registered_country": {"iso_code": "AU"}})
+    writer.insert("2001:db8::/32", {"country": {"iso_code": "BR"}})
+    writer.write(path, "Test-Country")
+    return path
+
+
+@pytest.mark.parametrize("record_size", [24, 28, 32])
+def test_ipv4_and_ipv6_lookups(tmp_path, record_size):
+    reader = MMDBReader(str(country_db(tmp_path / "country.mmdb", record_size=record_size)))
+
+    assert reader.metadata["database_type"] == "Test-Country"
+    assert reader.get("8.8.8.8") == {"country": {"iso_code": "US"}}
+    assert reader.get("1.2.3.4") == {"registered_country": {"iso_code": "AU"}}
+    assert reader.get("2001:db8::1") == {"country": {"iso_code": "BR"}}
+    assert reader.get("9.9.9.9") is None
+    assert reader.get("2001:db9::1") is None
+    reader.close()
+
+
+def test_ipv4_only_database(tmp_path):
+    writer = MMDBWriter(ip_version=4, record_size=24)
+    writer.insert("10.0.0.0/8", {"country": {"iso_code": "ZZ"}})
+    writer.write(tmp_path / "v4.mmdb")
+    reader = MMDBReader(str(tmp_path / "v4.mmdb"))
+
+    assert reader.get("10.1.2.3") == {"country": {"iso_code": "ZZ"}}
+    assert reader.get("11.0.0.1") is None
+    assert reader.get("2001:db8::1") is None
+    reader.close()
+
+
+def test_pointer_heavy_record(tmp_path):
+    writer = MMDBWriter()
+    org = writer.add_data("GOOGLE")
+    iso_key = writer.add_data("iso_code")
+    # Padding pushes the next shared values into the larger pointer size classes
+    writer.add_data(b"\0" * 4000)
+    country = writer.add_data({Pointer(iso_key): "US"})
+    writer.add_data(b"\0" * 60000)
+    writer.add_data(b"\0" * 600000)
+    asn = writer.add_data(15169)
+    # One-, two- and three-byte pointer size classes
+    assert org < 2048 <= country < 526336 <= asn
+
+    writer.insert("8.8.8.0/24", {
+        "country": Pointer(country),
+        "registered_country": Pointer(country),
+        "autonomous_system_number": Pointer(asn),
+        "autonomous_system_organization": Pointer(org),
+        "networks": [Pointer(org), 2 ** 40, 1.5, True]
+    })
+    writer.write(tmp_path / "pointers.mmdb")
+    reader = MMDBReader(str(tmp_path / "pointers.mmdb"))
+
+    assert reader.get("8.8.8.8") == {
+        "country": {"iso_code": "US"},
+        "registered_country": {"iso_code": "US"},
+        "autonomous_system_number": 15169,
+        "autonomous_system_organization": "GOOGLE",
+        "networks": ["GOOGLE", 2 ** 40, 1.5, True]
+    }
+    reader.close()
+
+
+def test_geoip_service_combines_country_and_asn(tmp_path):
+    asn_writer = MMDBWriter()
+    asn_writer.insert("8.8.8.0/24", {
+        "autonomous_system_number": 15169,
+        "autonomous_system_organization": "GOOGLE"
+    })
+    asn_writer.write(tmp_path / "asn.mmdb")
+    service = GeoIPService(str(country_db(tmp_path / "country.mmdb")), str(tmp_path / "asn.mmdb"))
+
+    assert service.lookup("8.8.8.8") == {"country": "US", "asn": 15169, "as_org": "GOOGLE"}
+    assert service.lookup("1.2.3.4") == {"country": "AU"}
+    assert service.lookup("203.0.113.1") == {}
+
+
+def test_reload_swaps_in_replaced_file(tmp_path):
+    path = tmp_path / "country.mmdb"
+    database = GeoIPDatabase(str(country_db(path, "US")))
+    assert database.get("8.8.8.8") == {"country": {"iso_code": "US"}}
+
+    # Replace the file the way database updates do: write aside, then rename over it
+    country_db(tmp_path / "country.mmdb.new", "CA")
+    os.replace(tmp_path / "country.mmdb.new", path)
+    database.reload()
+
+    assert database.get("8.8.8.8") == {"country": {"iso_code": "CA"}}
+
+
+def test_reload_keeps_current_reader_when_new_file_is_invalid(tmp_path):
+    path = tmp_path / "country.mmdb"
+    database = GeoIPDatabase(str(country_db(path, "US")))
+
+    (tmp_path / "broken.mmdb").write_bytes(b"not a database")
+    os.replace(tmp_path / "broken.mmdb", path)
+    database.reload()
+
+    assert database.get("8.8.8.8") == {"country": {"iso_code": "US"}}